@@ -2,19 +2,37 @@ import asyncio
 import inspect
 import logging
 import os
-import smtplib
 import sys
-import traceback
-from concurrent.futures import ThreadPoolExecutor
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import threading
+import time
 from functools import partial, wraps
-from pathlib import Path
+from traceback import format_stack
 from typing import Coroutine
 
 import structlog
+from risclog.logging import (
+    callsite,
+    metrics,
+    recorder,
+    sampling,
+    tracebacks,
+)
+from risclog.logging.formatting import Lazy  # noqa: F401
+from risclog.logging.formatting import RiscFormatter, format_positional_args
+from risclog.logging.handlers import BatchingStreamHandler, RiscStreamHandler
+from risclog.logging.record import EventRecord
+from risclog.logging.timestamps import CachedTimeStamper
 from structlog.types import Processor
 
+_LEVELS = {
+    'debug': (logging.DEBUG, 'debug'),
+    'info': (logging.INFO, 'info'),
+    'warning': (logging.WARNING, 'warning'),
+    'error': (logging.ERROR, 'error'),
+    'critical': (logging.CRITICAL, 'critical'),
+    'fatal': (logging.CRITICAL, 'critical'),
+}
+
 
 def rename_event_to_message(_, __, event_dict):
     if 'event' in event_dict:
@@ -27,19 +45,155 @@ def rename_event_to_message(_, __, event_dict):
     return sorted_dict
 
 
+async def _noop() -> None:
+    pass
+
+
+_configure_lock = threading.Lock()
+
+
+def _structured_default() -> bool:
+    return os.getenv('LOG_DECORATOR_MODE', 'text').lower() == 'structured'
+
+
+def _is_logged(logger: 'RiscLogger', levelno: int) -> bool:
+    # Below the level, only the flight recorder needs the messages.
+    return logger._stdlib_logger.isEnabledFor(levelno) or recorder.is_enabled()
+
+
+def _render_stack(frame) -> str:
+    # Same layout as structlog's StackInfoRenderer.
+    stack = ''.join(format_stack(frame)).rstrip('\n')
+    return f'Stack (most recent call last):\n{stack}'
+
+
+def _call_event(name: str, params: dict, structured: bool):
+    if structured:
+        return 'method called', {'function': name, 'args': params}
+    if params:
+        return f'Method called: "{name}" with: "{params}"', {}
+    return f'Method "{name}" called with no arguments.', {}
+
+
+def _site_fields(site: callsite.Callsite) -> dict:
+    return callsite.fields(site) if callsite.is_enabled() else {}
+
+
+_SIZED_TYPES = frozenset((str, bytes, list, tuple, dict, set))
+
+
+def _return_event(name: str, value, start: float, structured: bool):
+    if not structured:
+        return f'Method "{name}" returned: "{value}"', {}
+    fields = {
+        'function': name,
+        'outcome': 'success',
+        'result_type': type(value).__name__,
+        'duration_ms': (time.perf_counter() - start) * 1000,
+    }
+    # Other types may evaluate lazily or raise in __len__.
+    if type(value) in _SIZED_TYPES:
+        fields['result_len'] = len(value)
+    return 'method returned', fields
+
+
+def _error_event(
+    name: str,
+    exc: Exception,
+    message: str,
+    traceback: str,
+    start: float,
+    structured: bool,
+):
+    if not structured:
+        return message, {}
+    fields = {
+        'function': name,
+        'outcome': 'error',
+        'error_type': type(exc).__name__,
+        'error': str(exc),
+        'traceback': traceback,
+        'duration_ms': (time.perf_counter() - start) * 1000,
+    }
+    return 'method failed', fields
+
+
 class RiscLogger:
+    _configured = False
+
     def __init__(self, name: str = None) -> None:
         self.logger = structlog.stdlib.get_logger(name)
         self.logger_name = name
+        self._stdlib_logger = logging.getLogger(name)
 
     def __new__(cls, *args, **kwargs):
-        cls._configure_logger()
+        if not RiscLogger._configured:
+            cls._configure_logger()
         instance = super().__new__(cls)
 
         return instance
 
+    @staticmethod
+    def _shared_processors() -> list:
+        timestamper = CachedTimeStamper(fmt='%Y-%m-%d %H:%M:%S')
+        shared_processors: list[Processor] = [
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.ExtraAdder(),
+            timestamper,
+            structlog.processors.StackInfoRenderer(),
+            rename_event_to_message,
+        ]
+        return shared_processors
+
+    @classmethod
+    def _create_formatter(
+        cls, renderer: Processor = None
+    ) -> structlog.stdlib.ProcessorFormatter:
+        return RiscFormatter(
+            foreign_pre_chain=cls._shared_processors(),
+            processors=[
+                format_positional_args,
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                renderer or structlog.dev.ConsoleRenderer(),
+            ],
+        )
+
+    @classmethod
+    def _create_shipping_handler(cls, address: str) -> logging.Handler:
+        from risclog.logging.shipping import ShippingHandler
+
+        protocol = os.getenv('LOG_SHIPPING_FORMAT', 'json')
+        handler = ShippingHandler(
+            address,
+            protocol=protocol,
+            spill_path=os.getenv('LOG_SHIPPING_SPILL_PATH'),
+        )
+        if protocol == 'json':
+            renderer = structlog.processors.JSONRenderer()
+        else:
+            renderer = structlog.dev.ConsoleRenderer(colors=False)
+        handler.setFormatter(cls._create_formatter(renderer))
+        return handler
+
     @classmethod
     def _configure_logger(cls):
+        """Configure structlog and the stdlib loggers.
+
+        This happens once, when the first `RiscLogger` is created. Afterwards
+        the configuration is left alone, so handlers added later are kept and
+        logging threads never see a half-configured root logger.
+        """
+        with _configure_lock:
+            if RiscLogger._configured:
+                return
+            cls._setup_logging()
+            # Set last: threads that see the flag skip the lock.
+            RiscLogger._configured = True
+
+    @classmethod
+    def _setup_logging(cls):
         LEVELS = {
             'CRITICAL': 50,
             'FATAL': 50,
@@ -52,55 +206,58 @@ class RiscLogger:
 
         log_level = LEVELS.get(os.getenv('LOG_LEVEL'), 20)
 
-        timestamper = structlog.processors.TimeStamper(fmt='%Y-%m-%d %H:%M:%S')
-        shared_processors: list[Processor] = [
-            structlog.contextvars.merge_contextvars,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.stdlib.ExtraAdder(),
-            timestamper,
-            structlog.processors.StackInfoRenderer(),
-            rename_event_to_message,
-        ]
+        shared_processors = cls._shared_processors()
 
         structlog.configure(
             logger_factory=structlog.stdlib.LoggerFactory(),
-            processors=shared_processors
+            processors=[metrics.start_processor_timer]
+            + shared_processors
             + [
+                metrics.stop_processor_timer,
                 structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
             ],
             wrapper_class=structlog.stdlib.BoundLogger,
             cache_logger_on_first_use=True,
         )
 
-        log_renderer: structlog.types.Processor
-        log_renderer = structlog.dev.ConsoleRenderer()
-        formatter = structlog.stdlib.ProcessorFormatter(
-            foreign_pre_chain=shared_processors,
-            processors=[
-                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                log_renderer,
-            ],
-        )
+        formatter = cls._create_formatter()
 
         # set logger Level from asyncio package to WARNING
         logging.getLogger('asyncio').setLevel(logging.WARNING)
         if not logging.getLogger().hasHandlers():
-            handler = logging.StreamHandler()
+            batch_size = os.getenv('LOG_BATCH_SIZE')
+            if batch_size:
+                handler = BatchingStreamHandler(
+                    batch_size=int(batch_size),
+                    interval=float(os.getenv('LOG_BATCH_INTERVAL', '1.0')),
+                )
+            else:
+                handler = RiscStreamHandler()
             handler.setFormatter(formatter)
+            root_handlers = [handler]
+
+            shipping_address = os.getenv('LOG_SHIPPING_ADDRESS')
+            if shipping_address:
+                root_handlers.append(
+                    cls._create_shipping_handler(shipping_address)
+                )
+
             root_logger = logging.getLogger()
-            root_logger.addHandler(handler)
             root_logger.setLevel(log_level)
+            # Publish the complete list at once, other threads see either no
+            # handlers or all of them.
+            root_logger.handlers = root_handlers
 
-        all_logger = list(logging.Logger.manager.loggerDict.keys())
+        all_logger = list(logging.Logger.manager.loggerDict)
         all_logger.extend(['uvicorn', 'uvicorn.error'])
 
+        # Replace the handler lists instead of clearing them in place, so a
+        # thread that is emitting a record keeps iterating the old list.
         for _log in list(set(all_logger)):
-            logging.getLogger(_log).handlers.clear()
+            logging.getLogger(_log).handlers = []
             logging.getLogger(_log).propagate = True
 
-        logging.getLogger('uvicorn.access').handlers.clear()
+        logging.getLogger('uvicorn.access').handlers = []
         logging.getLogger('uvicorn.access').propagate = False
 
         def handle_exception(exc_type, exc_value, exc_traceback):
@@ -111,28 +268,82 @@ class RiscLogger:
 
         sys.excepthook = handle_exception
 
+        if os.getenv('LOG_CALLSITE', '').lower() in ('1', 'true', 'yes'):
+            callsite.enable()
+
+        flight_recorder = os.getenv('LOG_FLIGHT_RECORDER')
+        if flight_recorder:
+            recorder.enable(int(flight_recorder))
+
+        metrics_interval = os.getenv('LOG_METRICS_INTERVAL')
+        if metrics_interval:
+            metrics.start_reporter(
+                interval=float(metrics_interval),
+                path=os.getenv('LOG_METRICS_FILE'),
+            )
+
+    def _emit(
+        self,
+        level: str,
+        msg: str,
+        sender: str,
+        function_id: str,
+        args: tuple,
+        kwargs: dict,
+    ) -> None:
+        start = time.perf_counter()
+        levelno, level_label = _LEVELS[level]
+        context = structlog.contextvars.get_contextvars()
+        function = context.pop('_function', None)
+        script = context.pop('_script', None)
+        if context:
+            kwargs = {**context, **kwargs}
+        # Positional args stay unformatted in the record, the formatter
+        # applies them when the record is rendered.
+        event = EventRecord(
+            timestamp=time.time(),
+            level=level_label,
+            logger=self.logger_name,
+            message=msg,
+            id=function_id,
+            sender=sender,
+            function=function,
+            script=script,
+            args=args,
+            extra=kwargs,
+        )
+        logger = self._stdlib_logger
+        record = logger.makeRecord(
+            logger.name, levelno, __file__, 0, event, (), None
+        )
+        record.created = event.timestamp
+        metrics.observe('processors', time.perf_counter() - start)
+        if sampling.hold(record):
+            return
+        logger.handle(record)
+        metrics.increment(
+            'records_emitted', _LEVELS[level][1], self.logger_name or 'root'
+        )
+
     async def _async_log(
         self,
         level: str,
         msg: str,
         sender: str,
-        function_id: int,
-        *args,
-        **kwargs,
+        function_id: str,
+        args: tuple,
+        kwargs: dict,
     ) -> Coroutine:
         await asyncio.sleep(0)
-        func = getattr(self.logger, level.lower())
-        sender = kwargs.get('sender') if kwargs.get('sender') else sender
-        kwargs = {**{'__id': function_id, '__sender': sender}, **kwargs}
-        func(msg, *args, **kwargs)
+        self._emit(level, msg, sender, function_id, args, kwargs)
 
     def _log(
         self,
         level: str,
         msg: str,
-        sender: str = 'inline',
-        method_id: int = None,
         *args,
+        sender: str = 'inline',
+        method_id: str = None,
         **kwargs,
     ) -> Coroutine:
         try:
@@ -140,144 +351,180 @@ class RiscLogger:
         except RuntimeError:
             loop = None
 
+        levelno, level_label = _LEVELS[level]
+        if not self._stdlib_logger.isEnabledFor(levelno):
+            metrics.increment(
+                'records_dropped', level_label, self.logger_name or 'root'
+            )
+            if recorder.is_enabled():
+                recorder.capture(
+                    levelno,
+                    self.logger_name,
+                    msg,
+                    args,
+                    {'__id': method_id, '__sender': sender, **kwargs},
+                )
+            return _noop() if loop and loop.is_running() else None
+
+        if kwargs.pop('stack_info', False):
+            # Rendered here, where the frame of the caller is known.
+            kwargs['stack'] = _render_stack(sys._getframe(2))
         if method_id:
+            # The decorator passes the callsite fields itself.
             function_id = method_id
         else:
-            caller_frame = inspect.stack()[2]
-            caller_name = caller_frame.function
-            function_id = id(caller_name)
+            frame = sys._getframe(2)
+            site = callsite.for_frame(frame)
+            function_id = site.id
+            if callsite.is_enabled():
+                kwargs = {**callsite.fields(site, frame.f_lineno), **kwargs}
 
         if loop and loop.is_running():
-
             return self._async_log(
-                level=level,
-                msg=msg,
-                sender=sender,
-                function_id=function_id,
-                *args,
-                **kwargs,
-            )
-        else:
-            return asyncio.run(
-                self._async_log(
-                    level=level,
-                    msg=msg,
-                    sender=sender,
-                    function_id=function_id,
-                    *args,
-                    **kwargs,
-                )
+                level, msg, sender, function_id, args, kwargs
             )
+        self._emit(level, msg, sender, function_id, args, kwargs)
 
     def debug(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='debug', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('debug', msg, *args, method_id=method_id, **kwargs)
 
     def info(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='info', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('info', msg, *args, method_id=method_id, **kwargs)
 
     def warning(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='warning', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('warning', msg, *args, method_id=method_id, **kwargs)
 
     def fatal(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='fatal', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('fatal', msg, *args, method_id=method_id, **kwargs)
 
     def critical(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='critical', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('critical', msg, *args, method_id=method_id, **kwargs)
 
     def exception(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='error', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        recorder.flush()
+        return self._log('error', msg, *args, method_id=method_id, **kwargs)
 
     def error(
-        self, msg: str = None, method_id: int = None, *args, **kwargs
+        self, msg: str = None, *args, method_id: str = None, **kwargs
     ) -> Coroutine:
-        return self._log(
-            level='error', msg=msg, method_id=method_id, *args, **kwargs
-        )
+        return self._log('error', msg, *args, method_id=method_id, **kwargs)
 
     @classmethod
-    def decorator(cls, method=None, send_email=False):
+    def decorator(cls, method=None, send_email=False, structured=None):
+        """Log calls, results and exceptions of the decorated function.
+
+        In text mode (the default) the arguments and the result are part of
+        the message. With `structured` (or ``LOG_DECORATOR_MODE=structured``)
+        the events have constant names (``method called``, ``method
+        returned``, ``method failed``) and the details are separate fields:
+        `function`, `args`, `result_type`, `result_len`, `duration_ms` and
+        `outcome`.
+        """
         if method is None:
-            return lambda m: cls.decorator(m, send_email)
+            return lambda m: cls.decorator(m, send_email, structured)
 
-        method_id = id(method.__name__)
+        if structured is None:
+            structured = _structured_default()
+        site = callsite.for_function(method)
+        method_id = site.id
         logger = cls(name=method.__module__)
 
         if inspect.iscoroutinefunction(method):
 
             @wraps(method)
             async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
                 try:
-                    script = Path(inspect.getfile(method)).name
+                    script = os.path.basename(inspect.getfile(method))
                     structlog.contextvars.bind_contextvars(
                         _function=method.__name__,
                         _script=script,
                     )
 
-                    frame = inspect.currentframe()
-                    _, _, _, frame_values = inspect.getargvalues(frame)
                     args_dict = {f'arg_{i}': arg for i, arg in enumerate(args)}
-                    params = {**args_dict, **frame_values.get('kwargs')}
+                    params = {**args_dict, **kwargs}
 
-                    if params:
-                        await logger.info(
-                            f'Method called: "{method.__name__}" with: "{params}"',
-                            sender='async_logging_decorator',
-                            method_id=method_id,
-                        )
-                    else:
-                        await logger.info(
-                            f'Method "{method.__name__}" called with no arguments.',
-                            sender='async_logging_decorator',
-                            method_id=method_id,
+                    msg, fields = None, {}
+                    if _is_logged(logger, logging.INFO):
+                        msg, fields = _call_event(
+                            method.__name__, params, structured
                         )
+                    await logger.info(
+                        msg,
+                        sender='async_logging_decorator',
+                        method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
+                    )
 
+                    start = time.perf_counter()
                     value = await method(*args, **kwargs)
+                    msg, fields = None, {}
+                    if _is_logged(logger, logging.INFO):
+                        msg, fields = _return_event(
+                            method.__name__, value, start, structured
+                        )
                     await logger.info(
-                        f'Method "{method.__name__}" returned: "{value}"',
+                        msg,
                         sender='async_logging_decorator',
                         method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
                     )
                     return value
                 except Exception as exc:
                     message = f'Exception occurred in method: {method.__name__}, exception: {exc}'
+                    traceback = None
+                    if send_email or _is_logged(logger, logging.ERROR):
+                        # The same rendering goes into the record and the e-mail.
+                        traceback = exception_to_string(excp=exc)
+                        message = f'{message}\n\n\n{traceback}'
+                    debug_context = recorder.drain()
+                    recorder.emit(debug_context)
                     if send_email:
+                        metrics.increment('emails', 'queued')
+                        from concurrent.futures import ThreadPoolExecutor
+
                         with ThreadPoolExecutor() as executor:
-                            message = f'{message}\n\n\n{exception_to_string(excp=exc)}'
+                            email_message = message
+                            if debug_context:
+                                email_message = (
+                                    f'{message}\n\n\nDebug context:\n'
+                                    f'{recorder.format_records(debug_context)}'
+                                )
                             executor.submit(
                                 partial(
                                     smtp_email_send,
-                                    message=message,
+                                    message=email_message,
                                     logger_name=logger.logger_name,
                                 )
                             )
-                    await logger.exception(
+                    msg, fields = _error_event(
+                        method.__name__,
+                        exc,
                         message,
+                        traceback,
+                        start,
+                        structured,
+                    )
+                    await logger.exception(
+                        msg,
                         sender='async_logging_decorator',
                         method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
                     )
                     raise exc
                 finally:
@@ -290,54 +537,86 @@ class RiscLogger:
 
             @wraps(method)
             def sync_wrapper(*args, **kwargs):
+                start = time.perf_counter()
                 try:
-                    script = Path(inspect.getfile(method)).name
+                    script = os.path.basename(inspect.getfile(method))
                     structlog.contextvars.bind_contextvars(
                         _function=method.__name__,
                         _script=script,
                     )
 
-                    frame = inspect.currentframe()
-                    _, _, _, frame_values = inspect.getargvalues(frame)
                     args_dict = {f'arg_{i}': arg for i, arg in enumerate(args)}
-                    params = {**args_dict, **frame_values.get('kwargs')}
+                    params = {**args_dict, **kwargs}
 
-                    if params:
-                        logger.info(
-                            f'Method called: "{method.__name__}" with: "{params}"',
-                            sender='logging_decorator',
-                            method_id=method_id,
-                        )
-                    else:
-                        logger.info(
-                            f'Method "{method.__name__}" called with no arguments.',
-                            sender='logging_decorator',
-                            method_id=method_id,
+                    msg, fields = None, {}
+                    if _is_logged(logger, logging.INFO):
+                        msg, fields = _call_event(
+                            method.__name__, params, structured
                         )
+                    logger.info(
+                        msg,
+                        sender='logging_decorator',
+                        method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
+                    )
 
+                    start = time.perf_counter()
                     value = method(*args, **kwargs)
+                    msg, fields = None, {}
+                    if _is_logged(logger, logging.INFO):
+                        msg, fields = _return_event(
+                            method.__name__, value, start, structured
+                        )
                     logger.info(
-                        f'Method "{method.__name__}" returned: "{value}"',
+                        msg,
                         sender='logging_decorator',
                         method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
                     )
                     return value
                 except Exception as exc:
                     message = f'Exception occurred in method: {method.__name__}, exception: {exc}'
+                    traceback = None
+                    if send_email or _is_logged(logger, logging.ERROR):
+                        # The same rendering goes into the record and the e-mail.
+                        traceback = exception_to_string(excp=exc)
+                        message = f'{message}\n\n\n{traceback}'
+                    debug_context = recorder.drain()
+                    recorder.emit(debug_context)
                     if send_email:
+                        metrics.increment('emails', 'queued')
+                        from concurrent.futures import ThreadPoolExecutor
+
                         with ThreadPoolExecutor() as executor:
-                            message = f'{message}\n\n\n{exception_to_string(excp=exc)}'
+                            email_message = message
+                            if debug_context:
+                                email_message = (
+                                    f'{message}\n\n\nDebug context:\n'
+                                    f'{recorder.format_records(debug_context)}'
+                                )
                             executor.submit(
                                 partial(
                                     smtp_email_send,
-                                    message=message,
+                                    message=email_message,
                                     logger_name=logger.logger_name,
                                 )
                             )
-                    logger.exception(
+                    msg, fields = _error_event(
+                        method.__name__,
+                        exc,
                         message,
+                        traceback,
+                        start,
+                        structured,
+                    )
+                    logger.exception(
+                        msg,
                         sender='logging_decorator',
                         method_id=method_id,
+                        **_site_fields(site),
+                        **fields,
                     )
                     raise exc
                 finally:
@@ -360,12 +639,8 @@ def get_logger(name: str = None):
     return RiscLogger(name=name)
 
 
-def exception_to_string(excp):
-    stack = traceback.extract_stack()[:-3] + traceback.extract_tb(
-        excp.__traceback__
-    )
-    pretty = traceback.format_list(stack)
-    return ''.join(pretty) + '\n  {} {}'.format(excp.__class__, excp)
+def exception_to_string(excp, limit: int = tracebacks.DEFAULT_LIMIT):
+    return tracebacks.format_exception(excp, limit=limit)
 
 
 def smtp_email_send(message: str, logger_name: str) -> None:
@@ -375,6 +650,11 @@ def smtp_email_send(message: str, logger_name: str) -> None:
     smtp_server = os.getenv('LOGGING_EMAIL_SMTP_SERVER')
 
     if smtp_user and smtp_password and email_to and smtp_server:
+        # Imported here, most processes never send an e-mail.
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
         # Email server setup
         smtp_user = smtp_user
         smtp_password = smtp_password
@@ -387,12 +667,18 @@ def smtp_email_send(message: str, logger_name: str) -> None:
         email_message.attach(MIMEText(message, 'plain'))
 
         # Send the email
-        with smtplib.SMTP(host=smtp_server, port=465) as smtp:
-            smtp.ehlo()
-            smtp.starttls()
-            smtp.login(smtp_user, smtp_password)
-            smtp.send_message(email_message)
+        try:
+            with smtplib.SMTP(host=smtp_server, port=465) as smtp:
+                smtp.ehlo()
+                smtp.starttls()
+                smtp.login(smtp_user, smtp_password)
+                smtp.send_message(email_message)
+        except Exception:
+            metrics.increment('emails', 'failed')
+            raise
+        metrics.increment('emails', 'sent')
     else:
+        metrics.increment('emails', 'failed')
         logger = get_logger(name=logger_name)
         logger.error(
             'Emails cannot be sent because one or more environment variables are not set!'
@@ -0,0 +1,91 @@
+"""Access log for ASGI applications without the processor chain.
+
+`RiscLogger` configures the `uvicorn.access` logger to drop its records,
+because sending every request through the full chain is too slow. Wrap the
+application in `AccessLogMiddleware` instead: it writes one compact line per
+HTTP request, with method, path, status, response size and duration, as a
+preformatted `EventRecord` straight to the handlers of the root logger::
+
+    app = AccessLogMiddleware(app)
+
+With ``fields=True`` the values are added as separate fields as well, for
+JSON renderers and log collectors.
+"""
+import logging
+import time
+
+from risclog.logging import metrics
+from risclog.logging.record import EventRecord
+
+
+class AccessLogMiddleware:
+    def __init__(
+        self, app, logger_name: str = 'uvicorn.access', fields: bool = False
+    ) -> None:
+        self.app = app
+        self.logger_name = logger_name
+        self.fields = fields
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_count(message) -> None:
+            nonlocal status, size
+            if message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            elif message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            self.log(scope, status, size, time.perf_counter() - start)
+
+    def log(self, scope, status: int, size: int, duration: float) -> None:
+        root = logging.getLogger()
+        if not root.isEnabledFor(logging.INFO):
+            metrics.increment('records_dropped', 'info', self.logger_name)
+            return
+        client = scope.get('client')
+        client = f'{client[0]}:{client[1]}' if client else '-'
+        method = scope['method']
+        path = scope.get('root_path', '') + scope['path']
+        query = scope.get('query_string')
+        if query:
+            path = f'{path}?{query.decode("latin-1")}'
+        duration_ms = duration * 1000
+        message = (
+            f'{client} - "{method} {path} HTTP/{scope["http_version"]}" '
+            f'{status} {size}B {duration_ms:.2f}ms'
+        )
+        extra = None
+        if self.fields:
+            extra = {
+                'method': method,
+                'path': path,
+                'status': status,
+                'bytes': size,
+                'duration_ms': duration_ms,
+            }
+        event = EventRecord(
+            timestamp=time.time(),
+            level='info',
+            logger=self.logger_name,
+            message=message,
+            id=None,
+            sender='access_log',
+            extra=extra,
+        )
+        record = logging.LogRecord(
+            self.logger_name, logging.INFO, __file__, 0, event, (), None
+        )
+        record.created = event.timestamp
+        root.handle(record)
+        metrics.increment('records_emitted', 'info', self.logger_name)
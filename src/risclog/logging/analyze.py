@@ -0,0 +1,368 @@
+"""Analyze risclog output offline.
+
+Run with ``python -m risclog.logging.analyze app.log [app.log.1.gz ...]``.
+
+The files are streamed through a pipeline of generators: lines are read
+through `mmap` for plain files and through the decompressing file objects
+for ``.gz``, ``.bz2`` and ``.xz`` files, parsed into fields (console output,
+with or without colors, and JSON lines) and fed to `Analyzer`. The analyzer
+matches the "called" and "returned" lines of the decorator by their ``__id``
+into call spans, counts inline lines logged while a span is open and keeps
+per function call counts, errors and a bounded sample of durations for the
+latency percentiles. Spans that were never closed are reported as
+unmatched. Memory use does not depend on the size of the files.
+"""
+import argparse
+import bz2
+import datetime
+import gzip
+import json
+import lzma
+import mmap
+import random
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+DECORATOR_SENDERS = ('logging_decorator', 'async_logging_decorator')
+PERCENTILES = (50, 90, 99)
+MAX_SAMPLES = 10000
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*m')
+_HEADER = re.compile(
+    r'(?P<timestamp>\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:\.\d+)?) '
+    r'\[(?P<level>\w+)\s*\] (?:\[(?P<logger>[^\]]*)\] )?'
+)
+# Keys that start a new field. Values of other keys and of the message may
+# contain spaces, so only these are used to split the line.
+_KEYS = (
+    '__id',
+    '__sender',
+    '_function',
+    '_script',
+    'args',
+    'duration_ms',
+    'error',
+    'error_type',
+    'function',
+    'message',
+    'outcome',
+    'result_len',
+    'result_type',
+)
+_FIELD = re.compile(r'(?:^| )(%s)=' % '|'.join(_KEYS))
+# Only timestamps with a fraction of a second give meaningful durations.
+_SUBSECOND = re.compile(r':\d\d\.\d')
+_NAME = re.compile(
+    r'Method called: "(?P<a>[^"]*)"|Method "(?P<b>[^"]*)"'
+    r'|Exception occurred in method: (?P<c>.*?), exception:'
+)
+
+
+# Reading
+
+
+def _mmap_lines(path: str) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            start, size = 0, len(mapped)
+            while start < size:
+                end = mapped.find(b'\n', start)
+                if end == -1:
+                    end = size
+                yield mapped[start:end]
+                start = end + 1
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Yield the lines of `path` (``-`` for stdin) without line endings."""
+    if path == '-':
+        for line in sys.stdin:
+            yield line.rstrip('\r\n')
+        return
+    opener = next(
+        (o for suffix, o in OPENERS.items() if path.endswith(suffix)), None
+    )
+    if opener is None:
+        lines = _mmap_lines(path)
+    else:
+        lines = opener(path, 'rb')
+    try:
+        for line in lines:
+            yield line.decode('utf-8', 'replace').rstrip('\r\n')
+    finally:
+        lines.close()
+
+
+# Parsing
+
+
+def parse_line(line: str) -> Optional[dict]:
+    """Return the fields of a rendered line, or None for other lines."""
+    if line.startswith('{'):
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            return None
+        return fields if isinstance(fields, dict) else None
+    line = _ANSI.sub('', line)
+    header = _HEADER.match(line)
+    if header is None:
+        return None
+    fields = {k: v for k, v in header.groupdict().items() if v is not None}
+    rest = line[header.end() :]
+    matches = list(_FIELD.finditer(rest))
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(rest)
+        fields[match.group(1)] = rest[match.end() : end]
+    return fields
+
+
+def parse_lines(lines: Iterable[str]) -> Iterator[dict]:
+    for line in lines:
+        fields = parse_line(line)
+        if fields is not None:
+            yield fields
+
+
+def parse_timestamp(value) -> Optional[float]:
+    try:
+        return datetime.datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_duration_timestamp(value) -> Optional[float]:
+    """Parse `value` if it resolves fractions of a second, else None."""
+    if _SUBSECOND.search(str(value)) is None:
+        return None
+    return parse_timestamp(value)
+
+
+def event_kind(fields: dict) -> Optional[str]:
+    """Return ``call``, ``return`` or ``error`` for decorator lines."""
+    if fields.get('__sender') not in DECORATOR_SENDERS:
+        return None
+    message = str(fields.get('message', ''))
+    if message == 'method called' or message.startswith('Method called:'):
+        return 'call'
+    if message == 'method returned' or '" returned: "' in message:
+        return 'return'
+    if message == 'method failed' or message.startswith('Exception'):
+        return 'error'
+    if message.endswith('called with no arguments.'):
+        return 'call'
+    return None
+
+
+def function_name(fields: dict) -> str:
+    name = fields.get('function') or fields.get('_function')
+    if name:
+        return str(name)
+    match = _NAME.search(str(fields.get('message', '')))
+    if match:
+        return next(group for group in match.groups() if group is not None)
+    return '?'
+
+
+# Analysis
+
+
+class Span(NamedTuple):
+    id: str
+    function: str
+    start: Optional[float]
+    timestamp: str
+    line: int
+
+
+class FunctionStats:
+    __slots__ = ('calls', 'errors', 'inline', 'count', 'samples', 'max')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.inline = 0
+        self.count = 0
+        self.samples: List[float] = []
+        self.max = 0.0
+
+    def add_duration(self, duration_ms: float, rng: random.Random) -> None:
+        # Reservoir sampling keeps the memory per function bounded.
+        self.count += 1
+        self.max = max(self.max, duration_ms)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(duration_ms)
+        else:
+            index = rng.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = duration_ms
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = round(percent / 100 * (len(ordered) - 1))
+        return ordered[index]
+
+
+class Analyzer:
+    def __init__(self, seed: int = 0) -> None:
+        self.functions: Dict[str, FunctionStats] = {}
+        self.open: Dict[str, List[Span]] = {}
+        self.lines = 0
+        self.inline = 0
+        self._inline_counts: Dict[str, List[int]] = {}
+        self._rng = random.Random(seed)
+
+    def _stats(self, name: str) -> FunctionStats:
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats()
+        return stats
+
+    def feed(self, fields: dict) -> None:
+        self.lines += 1
+        span_id = str(fields.get('__id', ''))
+        kind = event_kind(fields)
+        if kind is None:
+            counts = self._inline_counts.get(span_id)
+            if counts:
+                counts[-1] += 1
+                self.inline += 1
+            return
+
+        name = function_name(fields)
+        timestamp = str(fields.get('timestamp', ''))
+        if kind == 'call':
+            self._stats(name).calls += 1
+            start = parse_duration_timestamp(timestamp)
+            span = Span(span_id, name, start, timestamp, self.lines)
+            self.open.setdefault(span_id, []).append(span)
+            self._inline_counts.setdefault(span_id, []).append(0)
+            return
+
+        stats = self._stats(name)
+        if kind == 'error':
+            stats.errors += 1
+        spans = self.open.get(span_id)
+        if not spans:
+            return
+        span = spans.pop()
+        stats.inline += self._inline_counts[span_id].pop()
+        if not spans:
+            del self.open[span_id]
+            del self._inline_counts[span_id]
+
+        duration = fields.get('duration_ms')
+        if duration is not None:
+            try:
+                duration = float(duration)
+            except ValueError:
+                duration = None
+        if duration is None:
+            end = parse_duration_timestamp(timestamp)
+            if end is not None and span.start is not None:
+                duration = (end - span.start) * 1000
+        if duration is not None:
+            stats.add_duration(duration, self._rng)
+
+    def feed_all(self, events: Iterable[dict]) -> 'Analyzer':
+        for fields in events:
+            self.feed(fields)
+        return self
+
+    def unmatched(self) -> List[Span]:
+        spans = [span for spans in self.open.values() for span in spans]
+        return sorted(spans, key=lambda span: span.line)
+
+    def report(self) -> dict:
+        functions = {}
+        for name, stats in sorted(self.functions.items()):
+            functions[name] = {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'inline_lines': stats.inline,
+                'max_ms': stats.max if stats.count else None,
+                **{
+                    f'p{percent}_ms': stats.percentile(percent)
+                    for percent in PERCENTILES
+                },
+            }
+        return {
+            'lines': self.lines,
+            'inline_lines': self.inline,
+            'functions': functions,
+            'unmatched': [span._asdict() for span in self.unmatched()],
+        }
+
+
+def analyze(paths: Iterable[str]) -> Analyzer:
+    analyzer = Analyzer()
+    for path in paths:
+        analyzer.feed_all(parse_lines(read_lines(path)))
+    return analyzer
+
+
+def _ms(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value:.2f}'
+
+
+def format_report(report: dict, limit: int = 20) -> str:
+    lines = [
+        f'{"function":<32} {"calls":>8} {"errors":>7} {"p50 ms":>9} '
+        f'{"p90 ms":>9} {"p99 ms":>9} {"max ms":>9}'
+    ]
+    for name, stats in report['functions'].items():
+        lines.append(
+            f'{name:<32} {stats["calls"]:>8} {stats["errors"]:>7} '
+            f'{_ms(stats["p50_ms"]):>9} {_ms(stats["p90_ms"]):>9} '
+            f'{_ms(stats["p99_ms"]):>9} {_ms(stats["max_ms"]):>9}'
+        )
+    unmatched = report['unmatched']
+    lines.append('')
+    lines.append(f'Unmatched calls: {len(unmatched)}')
+    for span in unmatched[:limit]:
+        lines.append(
+            f'  line {span["line"]}: {span["timestamp"]} {span["function"]} '
+            f'(__id={span["id"]})'
+        )
+    if len(unmatched) > limit:
+        lines.append(f'  ... {len(unmatched) - limit} more')
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m risclog.logging.analyze', description=__doc__
+    )
+    parser.add_argument('paths', nargs='+', help='log files, - for stdin')
+    parser.add_argument(
+        '--json', action='store_true', help='print the report as JSON'
+    )
+    parser.add_argument(
+        '-l',
+        '--limit',
+        type=int,
+        default=20,
+        help='unmatched calls to list (default: 20)',
+    )
+    args = parser.parse_args(argv)
+
+    report = analyze(args.paths).report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, limit=args.limit))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,496 @@
+"""Benchmarks for the risclog.logging hot paths.
+
+Run with ``python -m risclog.logging.benchmark``. Results can be written to
+a JSON file (``--output``) and compared against a previous run
+(``--compare``) to spot regressions between versions. ``--memory`` adds the
+peak memory allocated while running each benchmark, traced with
+`tracemalloc`.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import structlog
+from risclog.logging import (
+    RiscLogger,
+    exception_to_string,
+    get_logger,
+    rename_event_to_message,
+)
+from risclog.logging.access import AccessLogMiddleware
+from risclog.logging.handlers import BatchingStreamHandler, RiscStreamHandler
+from risclog.logging.timestamps import CachedTimeStamper
+
+BENCHMARKS: Dict[str, Callable[[int], float]] = {}
+THREAD_COUNTS = (1, 4, 16, 64)
+
+
+def benchmark(name: str):
+    def register(func: Callable[[int], float]):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+@contextlib.contextmanager
+def _silenced_output():
+    RiscLogger._configure_logger()
+    root_logger = logging.getLogger()
+    level = root_logger.level
+    root_logger.setLevel(logging.INFO)
+    handlers = [
+        h for h in root_logger.handlers if isinstance(h, logging.StreamHandler)
+    ]
+    with open(os.devnull, 'w') as devnull:
+        streams = [handler.setStream(devnull) for handler in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, streams):
+                handler.setStream(stream)
+            root_logger.setLevel(level)
+
+
+def _logger() -> RiscLogger:
+    return get_logger('risclog.logging.benchmark')
+
+
+@benchmark('sync_info')
+def bench_sync_info(number: int) -> float:
+    logger = _logger()
+    start = time.perf_counter()
+    for i in range(number):
+        logger.info('benchmark message', counter=i)
+    return time.perf_counter() - start
+
+
+@benchmark('structlog_info')
+def bench_structlog_info(number: int) -> float:
+    # The same line through structlog's processor chain, for comparison.
+    logger = structlog.stdlib.get_logger('risclog.logging.benchmark')
+    start = time.perf_counter()
+    for i in range(number):
+        logger.info('benchmark message', counter=i)
+    return time.perf_counter() - start
+
+
+@benchmark('async_info')
+def bench_async_info(number: int) -> float:
+    logger = _logger()
+
+    async def run() -> float:
+        start = time.perf_counter()
+        for i in range(number):
+            await logger.info('benchmark message', counter=i)
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+@benchmark('sync_debug_disabled')
+def bench_sync_debug_disabled(number: int) -> float:
+    logger = _logger()
+    start = time.perf_counter()
+    for i in range(number):
+        logger.debug('benchmark message', counter=i)
+    return time.perf_counter() - start
+
+
+@benchmark('decorator_no_args')
+def bench_decorator_no_args(number: int) -> float:
+    @RiscLogger.decorator
+    def decorated():
+        return None
+
+    start = time.perf_counter()
+    for _ in range(number):
+        decorated()
+    return time.perf_counter() - start
+
+
+@benchmark('decorator_with_args')
+def bench_decorator_with_args(number: int) -> float:
+    @RiscLogger.decorator
+    def decorated(a, b, flag=False):
+        return a + b
+
+    start = time.perf_counter()
+    for i in range(number):
+        decorated(i, 2, flag=True)
+    return time.perf_counter() - start
+
+
+@benchmark('decorator_structured')
+def bench_decorator_structured(number: int) -> float:
+    @RiscLogger.decorator(structured=True)
+    def decorated(a, b, flag=False):
+        return a + b
+
+    start = time.perf_counter()
+    for i in range(number):
+        decorated(i, 2, flag=True)
+    return time.perf_counter() - start
+
+
+@benchmark('async_decorator_with_args')
+def bench_async_decorator_with_args(number: int) -> float:
+    @RiscLogger.decorator
+    async def decorated(a, b):
+        return a + b
+
+    async def run() -> float:
+        start = time.perf_counter()
+        for i in range(number):
+            await decorated(i, 2)
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+@benchmark('decorator_exception')
+def bench_decorator_exception(number: int) -> float:
+    @RiscLogger.decorator
+    def faulty():
+        raise ValueError('benchmark error')
+
+    start = time.perf_counter()
+    for _ in range(number):
+        try:
+            faulty()
+        except ValueError:
+            pass
+    return time.perf_counter() - start
+
+
+@benchmark('exception_to_string')
+def bench_exception_to_string(number: int) -> float:
+    def nested(depth):
+        if depth:
+            nested(depth - 1)
+        raise ValueError('benchmark error')
+
+    start = time.perf_counter()
+    for _ in range(number):
+        try:
+            nested(10)
+        except ValueError as exc:
+            exception_to_string(exc)
+    return time.perf_counter() - start
+
+
+@benchmark('rename_event_to_message')
+def bench_rename_event_to_message(number: int) -> float:
+    event_dict = {
+        'event': 'benchmark message',
+        'level': 'info',
+        'logger': 'risclog.logging.benchmark',
+        'timestamp': '2024-08-05 11:38:51',
+        '__id': 4378622064,
+        '__sender': 'inline',
+        'referer': 'https://example.com',
+    }
+    start = time.perf_counter()
+    for _ in range(number):
+        rename_event_to_message(None, None, dict(event_dict))
+    return time.perf_counter() - start
+
+
+@benchmark('console_renderer')
+def bench_console_renderer(number: int) -> float:
+    renderer = structlog.dev.ConsoleRenderer(colors=False)
+    event_dict = {
+        'message': 'benchmark message',
+        'level': 'info',
+        'logger': 'risclog.logging.benchmark',
+        'timestamp': '2024-08-05 11:38:51',
+        '__id': 4378622064,
+        '__sender': 'inline',
+    }
+    start = time.perf_counter()
+    for _ in range(number):
+        renderer(None, 'info', dict(event_dict))
+    return time.perf_counter() - start
+
+
+def _timestamper_benchmark(timestamper):
+    def bench(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            timestamper(None, 'info', {})
+        return time.perf_counter() - start
+
+    return bench
+
+
+benchmark('timestamper_structlog')(
+    _timestamper_benchmark(
+        structlog.processors.TimeStamper(fmt='%Y-%m-%d %H:%M:%S')
+    )
+)
+benchmark('timestamper_cached')(_timestamper_benchmark(CachedTimeStamper()))
+benchmark('timestamper_cached_ms')(
+    _timestamper_benchmark(CachedTimeStamper(precision=3))
+)
+
+
+async def _asgi_app(scope, receive, send) -> None:
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'benchmark'})
+
+
+def _access_log_benchmark(app):
+    # Requests are sent to the ASGI app directly, so the numbers show the
+    # overhead of access logging without the cost of a server.
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'path': '/items',
+        'query_string': b'page=2',
+        'client': ('127.0.0.1', 54321),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    def bench(number: int) -> float:
+        async def run() -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                await app(scope, receive, send)
+            return time.perf_counter() - start
+
+        return asyncio.run(run())
+
+    return bench
+
+
+async def _asgi_app_logging_request(scope, receive, send) -> None:
+    # Access logging through the regular logger, for comparison.
+    start = time.perf_counter()
+    await _asgi_app(scope, receive, send)
+    await _logger().info(
+        'request',
+        method=scope['method'],
+        path=scope['path'],
+        status=200,
+        bytes=9,
+        duration_ms=(time.perf_counter() - start) * 1000,
+        method_id=1,
+    )
+
+
+benchmark('access_log_none')(_access_log_benchmark(_asgi_app))
+benchmark('access_log_logger')(
+    _access_log_benchmark(_asgi_app_logging_request)
+)
+benchmark('access_log_middleware')(
+    _access_log_benchmark(AccessLogMiddleware(_asgi_app))
+)
+
+
+def _handler_benchmark(handler_factory):
+    def bench(number: int) -> float:
+        with open(os.devnull, 'w') as devnull:
+            handler = handler_factory(devnull)
+            record = logging.LogRecord(
+                'benchmark', logging.INFO, '', 0, 'benchmark message', (), None
+            )
+            start = time.perf_counter()
+            for _ in range(number):
+                handler.handle(record)
+            handler.close()
+            return time.perf_counter() - start
+
+    return bench
+
+
+benchmark('handler_stream')(_handler_benchmark(RiscStreamHandler))
+benchmark('handler_batching')(_handler_benchmark(BatchingStreamHandler))
+
+
+def _threaded(threads: int):
+    def bench(number: int) -> float:
+        logger = _logger()
+        per_thread = max(number // threads, 1)
+        barrier = threading.Barrier(threads + 1)
+
+        def work():
+            barrier.wait()
+            for i in range(per_thread):
+                logger.info('benchmark message', counter=i)
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return (time.perf_counter() - start) * number / (per_thread * threads)
+
+    return bench
+
+
+for _threads in THREAD_COUNTS:
+    benchmark(f'threads_{_threads}')(_threaded(_threads))
+
+
+def run_benchmark(
+    func: Callable[[int], float], number: int, repeat: int
+) -> Dict[str, float]:
+    func(max(number // 10, 1))  # warm up caches and logger configuration
+    timings = [func(number) / number for _ in range(repeat)]
+    best = min(timings)
+    return {
+        'number': number,
+        'repeat': repeat,
+        'best_us': best * 1e6,
+        'median_us': statistics.median(timings) * 1e6,
+        'ops_per_sec': 1 / best if best else float('inf'),
+    }
+
+
+def measure_memory(func: Callable[[int], float], number: int) -> int:
+    """Return the peak of memory allocated while running `func`, in bytes.
+
+    Memory allocated and freed per call shows up as the peak, memory kept
+    across calls adds up over `number` calls.
+    """
+    func(max(number // 10, 1))
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        func(number)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def run(
+    names: List[str] = None,
+    number: int = 2000,
+    repeat: int = 5,
+    memory: bool = False,
+) -> Dict[str, object]:
+    results = {}
+    with _silenced_output():
+        for name in names or BENCHMARKS:
+            results[name] = run_benchmark(BENCHMARKS[name], number, repeat)
+            if memory:
+                results[name]['peak_bytes'] = measure_memory(
+                    BENCHMARKS[name], number
+                )
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'structlog': structlog.__version__,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(
+    current: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = 0.1,
+) -> List[str]:
+    """Return the names of benchmarks that got slower than `threshold`."""
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        if result['best_us'] > previous['best_us'] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def format_results(
+    current: Dict[str, object], baseline: Dict[str, object] = None
+) -> str:
+    lines = [f'{"benchmark":<28} {"best (us)":>12} {"ops/s":>12}']
+    memory = any('peak_bytes' in r for r in current['results'].values())
+    if memory:
+        lines[0] += f' {"peak (KiB)":>12}'
+    for name, result in current['results'].items():
+        line = (
+            f'{name:<28} {result["best_us"]:>12.2f} '
+            f'{result["ops_per_sec"]:>12.0f}'
+        )
+        if memory:
+            line += f' {result.get("peak_bytes", 0) / 1024:>12.1f}'
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous:
+            change = result['best_us'] / previous['best_us'] - 1
+            line += f' {change:>+8.1%}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m risclog.logging.benchmark', description=__doc__
+    )
+    parser.add_argument('names', nargs='*', help='benchmarks to run')
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument(
+        '-m',
+        '--memory',
+        action='store_true',
+        help='also measure peak memory allocation with tracemalloc',
+    )
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    parser.add_argument('-c', '--compare', help='baseline JSON to compare')
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='relative slowdown reported as regression (default: 0.1)',
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    current = run(
+        args.names, number=args.number, repeat=args.repeat, memory=args.memory
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(format_results(current, baseline))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'Regressions: {", ".join(regressions)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
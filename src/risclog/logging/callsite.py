@@ -0,0 +1,116 @@
+"""Callsite ids and optional callsite fields.
+
+Every record of `RiscLogger` carries an ``__id`` that identifies the function
+it was logged from: the decorated function for the decorator's lines, the
+calling function for inline lines. The id is derived from the module, the
+qualified name and the first line of the function's code object, so it is
+the same in every process and differs between functions of the same name,
+like the getter and setter of a property or two lambdas.
+
+Callsites are cached per code object, so resolving the callsite of a line
+that was logged before costs a dict lookup. With `enable` (or
+``LOG_CALLSITE=1``) the records get the fields ``_module``, ``_qualname``,
+``_file`` and ``_line`` as well.
+"""
+import hashlib
+from types import CodeType, FrameType
+from typing import Dict, NamedTuple, Optional
+
+MAX_CACHED_CALLSITES = 4096
+
+
+class Callsite(NamedTuple):
+    id: str
+    module: str
+    qualname: str
+    file: str
+    line: int
+
+
+_by_code: Dict[CodeType, Callsite] = {}
+_enabled = False
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def callsite_id(module: str, qualname: str) -> str:
+    key = f'{module}:{qualname}'.encode('utf-8', 'backslashreplace')
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+
+def for_code(
+    code: CodeType, module: Optional[str] = None, qualname: str = None
+) -> Callsite:
+    try:
+        return _by_code[code]
+    except KeyError:
+        pass
+    module = module or '?'
+    if hasattr(code, 'co_qualname'):
+        qualname = name = code.co_qualname
+    else:
+        # Before Python 3.11 code objects only know their plain name.
+        qualname = qualname or code.co_name
+        name = code.co_name
+    # The first line keeps the ids of functions with the same name apart.
+    key = f'{name}:{code.co_firstlineno}'
+    site = Callsite(
+        callsite_id(module, key),
+        module,
+        qualname,
+        code.co_filename,
+        code.co_firstlineno,
+    )
+    if len(_by_code) >= MAX_CACHED_CALLSITES:
+        _by_code.clear()
+    _by_code[code] = site
+    return site
+
+
+def for_frame(frame: FrameType) -> Callsite:
+    code = frame.f_code
+    site = _by_code.get(code)
+    if site is None:
+        site = for_code(code, frame.f_globals.get('__name__'))
+    return site
+
+
+def for_function(func) -> Callsite:
+    """Return the callsite of the (possibly wrapped) function `func`."""
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        return for_code(
+            code,
+            getattr(func, '__module__', None),
+            getattr(func, '__qualname__', None),
+        )
+    module = getattr(func, '__module__', None) or '?'
+    qualname = getattr(func, '__qualname__', None) or repr(func)
+    return Callsite(callsite_id(module, qualname), module, qualname, '?', 0)
+
+
+def fields(site: Callsite, line: Optional[int] = None) -> dict:
+    return {
+        '_module': site.module,
+        '_qualname': site.qualname,
+        '_file': site.file,
+        '_line': site.line if line is None else line,
+    }
+
+
+def clear_cache() -> None:
+    _by_code.clear()
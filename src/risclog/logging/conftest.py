@@ -1,3 +1,5 @@
+import logging
+
 import pytest
 from risclog.logging import RiscLogger, get_logger
 
@@ -19,3 +21,27 @@ def logger1() -> RiscLogger:
 @pytest.fixture
 def logger2() -> RiscLogger:
     return get_logger('test_logger_2')
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    @property
+    def messages(self):
+        return [record.msg['message'] for record in self.records]
+
+
+@pytest.fixture
+def handler(logger1):
+    handler = ListHandler()
+    logging.getLogger().addHandler(handler)
+    logger = logging.getLogger(logger1.logger_name)
+    logger.setLevel(logging.INFO)
+    yield handler
+    logging.getLogger().removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
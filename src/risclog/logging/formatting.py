@@ -0,0 +1,109 @@
+"""Deferred message formatting.
+
+Positional arguments and `Lazy` field values are kept unevaluated in the
+event dict and only resolved by `format_positional_args`, which runs inside
+the `ProcessorFormatter`, i.e. after the level check and only for records
+that are actually rendered.
+"""
+import logging
+import string
+from typing import Any, Callable, Mapping
+
+import structlog
+from risclog.logging.record import EventRecord
+
+
+class Lazy:
+    """Field value that is computed when the record is rendered."""
+
+    __slots__ = ('func',)
+
+    def __init__(self, func: Callable[[], Any]) -> None:
+        self.func = func
+
+    def __call__(self) -> Any:
+        return self.func()
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+    def __repr__(self) -> str:
+        return repr(self.func())
+
+
+def _resolve(value: Any) -> Any:
+    return value() if isinstance(value, Lazy) else value
+
+
+def _mapping(args: tuple) -> Mapping:
+    if len(args) == 1 and isinstance(args[0], Mapping) and args[0]:
+        return args[0]
+    return {}
+
+
+def _percent_style(msg: str, args: tuple) -> str:
+    # Same semantics as `logging.LogRecord.getMessage`.
+    return msg % (_mapping(args) or args)
+
+
+def _brace_style(msg: str, args: tuple) -> str:
+    return msg.format(*args, **_mapping(args))
+
+
+_formatter = string.Formatter()
+
+
+def _has_replacement_fields(msg: str) -> bool:
+    try:
+        return any(
+            field is not None for _, field, _, _ in _formatter.parse(msg)
+        )
+    except ValueError:
+        return False
+
+
+def format_message(msg: Any, args: tuple) -> str:
+    """Format `msg` with `%`-style or `{}`-style placeholders."""
+    msg = str(msg)
+    if not args:
+        return msg
+    args = tuple(_resolve(arg) for arg in args)
+    if '%' not in msg:
+        styles = (_brace_style,)
+    elif '{' in msg and _has_replacement_fields(msg):
+        # Literal percent signs would often pass as %-style conversions
+        # (``100% f``), so brace style wins if it has fields to fill.
+        styles = (_brace_style, _percent_style)
+    else:
+        styles = (_percent_style,)
+    for style in styles:
+        try:
+            return style(msg, args)
+        except (TypeError, ValueError, KeyError, IndexError):
+            continue
+    return f'{msg} {args!r}'
+
+
+def format_positional_args(_, __, event_dict):
+    args = event_dict.pop('positional_args', None)
+    key = 'message' if 'message' in event_dict else 'event'
+    if args and key in event_dict:
+        event_dict[key] = format_message(event_dict[key], args)
+    for name, value in event_dict.items():
+        if isinstance(value, Lazy):
+            event_dict[name] = value()
+    return event_dict
+
+
+class RiscFormatter(structlog.stdlib.ProcessorFormatter):
+    """`ProcessorFormatter` that renders `EventRecord`s directly.
+
+    Records from structlog or the stdlib go through the regular processors.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = record.msg
+        if not isinstance(event, EventRecord):
+            return super().format(record)
+        event_dict = format_positional_args(None, None, event.to_event_dict())
+        return self.processors[-1](self.logger, event.level, event_dict)
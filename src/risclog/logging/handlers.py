@@ -0,0 +1,208 @@
+import collections
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Deque, List, Optional
+
+from risclog.logging import metrics
+
+
+class RiscStreamHandler(logging.StreamHandler):
+    """StreamHandler that records rendering and write times.
+
+    Records are rendered outside of the handler lock, so concurrent threads
+    only wait for each other while a complete line is written.
+    """
+
+    def handle(self, record: logging.LogRecord):
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            start = time.perf_counter()
+            msg = self.format(record) + self.terminator
+            rendered = time.perf_counter()
+            with self.lock:
+                self.stream.write(msg)
+                self.flush()
+            written = time.perf_counter()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+        else:
+            metrics.observe('render', rendered - start)
+            metrics.observe('handler_write', written - rendered)
+
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def _write_all(fd: int, chunks: List[bytes]) -> None:
+    """Write `chunks` with as few syscalls as possible."""
+    if not hasattr(os, 'writev'):
+        groups = [[b''.join(chunks)]]
+    else:
+        groups = [
+            chunks[i : i + IOV_MAX] for i in range(0, len(chunks), IOV_MAX)
+        ]
+    for group in groups:
+        written = 0
+        if len(group) > 1:
+            written = os.writev(fd, group)
+            if written == sum(len(chunk) for chunk in group):
+                continue
+        view = memoryview(b''.join(group))[written:]
+        while view:
+            view = view[os.write(fd, view) :]
+
+
+class BatchingStreamHandler(RiscStreamHandler):
+    """StreamHandler that writes rendered lines in batches.
+
+    Lines are collected until `batch_size` bytes are buffered, `interval`
+    seconds have passed or a record of `flush_level` or above arrives. A batch
+    is written with a single `os.writev` call if the stream has a file
+    descriptor. Buffers are flushed on `logging.shutdown` and before `fork`.
+
+    Emitting threads append to a shared queue without taking the handler
+    lock; only the thread that flushes holds it while writing the batch.
+    """
+
+    _instances = weakref.WeakSet()
+
+    def __init__(
+        self,
+        stream=None,
+        batch_size: int = 64 * 1024,
+        interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+    ) -> None:
+        super().__init__(stream)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.flush_level = flush_level
+        self._chunks: Deque[bytes] = collections.deque()
+        self._size = 0
+        self._timer: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._instances.add(self)
+
+    def _fileno(self) -> Optional[int]:
+        try:
+            return self.stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def _encoding(self) -> str:
+        return getattr(self.stream, 'encoding', None) or 'utf-8'
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            start = time.perf_counter()
+            chunk = (self.format(record) + self.terminator).encode(
+                self._encoding(), 'backslashreplace'
+            )
+            metrics.observe('render', time.perf_counter() - start)
+            self._chunks.append(chunk)
+            # Not atomic across threads, only used to decide when to flush.
+            self._size += len(chunk)
+            if (
+                record.levelno >= self.flush_level
+                or self._size >= self.batch_size
+            ):
+                self.flush()
+            elif self._timer is None:
+                self._start_timer()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            chunks = self._take_chunks()
+            if not chunks:
+                return
+            start = time.perf_counter()
+            if self.stream and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+            fd = self._fileno()
+            if fd is None:
+                encoding = self._encoding()
+                self.stream.write(
+                    ''.join(chunk.decode(encoding) for chunk in chunks)
+                )
+                self.stream.flush()
+            else:
+                _write_all(fd, chunks)
+            metrics.observe('handler_write', time.perf_counter() - start)
+
+    def _take_chunks(self) -> List[bytes]:
+        chunks = []
+        try:
+            while True:
+                chunks.append(self._chunks.popleft())
+        except IndexError:
+            pass
+        self._size = 0
+        return chunks
+
+    def _start_timer(self) -> None:
+        with self.lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Thread(
+                target=self._flush_periodically,
+                name='risclog-batching-handler',
+                daemon=True,
+            )
+            self._timer.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        self._closed.set()
+        try:
+            self.flush()
+        finally:
+            super().close()
+
+    def _after_fork_in_child(self) -> None:
+        # The parent flushed before forking, anything left belongs to it.
+        self._chunks, self._size = collections.deque(), 0
+        self._timer = None
+
+
+def _flush_before_fork() -> None:
+    for handler in list(BatchingStreamHandler._instances):
+        try:
+            handler.flush()
+        except Exception:
+            pass
+
+
+def _reset_after_fork() -> None:
+    for handler in list(BatchingStreamHandler._instances):
+        handler._after_fork_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(
+        before=_flush_before_fork, after_in_child=_reset_after_fork
+    )
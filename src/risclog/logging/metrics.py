@@ -0,0 +1,248 @@
+"""Self-instrumentation of the logging pipeline.
+
+Counters and timings are kept per thread, so recording a value never takes a
+lock. `snapshot` merges the per-thread values on demand.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_registry = []
+# Values of threads that have finished, folded together.
+_retired = ({}, {})
+
+
+def _merge(target: Tuple[dict, dict], counters: dict, timings: dict) -> None:
+    target_counters, target_timings = target
+    for key, value in counters.items():
+        target_counters[key] = target_counters.get(key, 0) + value
+    for name, (count, total, maximum) in timings.items():
+        timing = target_timings.setdefault(name, [0, 0.0, 0.0])
+        timing[0] += count
+        timing[1] += total
+        timing[2] = max(timing[2], maximum)
+
+
+def _retire_dead_threads() -> None:
+    for entry in list(_registry):
+        thread, counters, timings = entry
+        if not thread.is_alive():
+            _merge(_retired, counters, timings)
+            _registry.remove(entry)
+
+
+def _thread_state() -> Tuple[dict, dict]:
+    try:
+        return _local.counters, _local.timings
+    except AttributeError:
+        _local.counters, _local.timings = {}, {}
+        with _registry_lock:
+            _retire_dead_threads()
+            _registry.append(
+                (threading.current_thread(), _local.counters, _local.timings)
+            )
+        return _local.counters, _local.timings
+
+
+def increment(name: str, *labels: str, value: int = 1) -> None:
+    counters = _thread_state()[0]
+    key = (name, *labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float) -> None:
+    timings = _thread_state()[1]
+    timing = timings.get(name)
+    if timing is None:
+        timings[name] = [1, seconds, seconds]
+    else:
+        timing[0] += 1
+        timing[1] += seconds
+        if seconds > timing[2]:
+            timing[2] = seconds
+
+
+_chain_start = threading.local()
+
+
+def start_processor_timer(_, __, event_dict):
+    _chain_start.value = time.perf_counter()
+    return event_dict
+
+
+def stop_processor_timer(_, __, event_dict):
+    start = getattr(_chain_start, 'value', None)
+    if start is not None:
+        observe('processors', time.perf_counter() - start)
+        _chain_start.value = None
+    return event_dict
+
+
+def reset() -> None:
+    with _registry_lock:
+        for _, counters, timings in _registry:
+            counters.clear()
+            timings.clear()
+        for values in _retired:
+            values.clear()
+
+
+def snapshot() -> Dict[str, dict]:
+    """Return the merged counters and timings of all threads."""
+    merged = ({}, {})
+    with _registry_lock:
+        _retire_dead_threads()
+        _merge(merged, *_retired)
+        for _, counters, timings in _registry:
+            _merge(merged, dict(counters), dict(timings))
+    counters, timings = merged
+
+    result = {
+        'records_emitted': {},
+        'records_dropped': {},
+        'emails': {'queued': 0, 'sent': 0, 'failed': 0},
+        'timings': {},
+    }
+    for (name, *labels), value in counters.items():
+        if name == 'emails':
+            result['emails'][labels[0]] = value
+        else:
+            level, logger_name = labels
+            result[name].setdefault(logger_name, {})[level] = value
+    for name, (count, total, maximum) in timings.items():
+        result['timings'][name] = {
+            'count': count,
+            'total_ms': total * 1000,
+            'max_ms': maximum * 1000,
+        }
+    return result
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def render_prometheus(data: Optional[Dict[str, dict]] = None) -> str:
+    """Render a snapshot in the Prometheus text exposition format."""
+    data = snapshot() if data is None else data
+    lines = []
+    for name, help_text in (
+        ('records_emitted', 'Log records written to the handlers.'),
+        ('records_dropped', 'Log records discarded before rendering.'),
+    ):
+        metric = f'risclog_logging_{name}_total'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for logger_name, levels in sorted(data[name].items()):
+            for level, value in sorted(levels.items()):
+                lines.append(
+                    f'{metric}{{logger="{_escape(logger_name)}",'
+                    f'level="{level}"}} {value}'
+                )
+
+    metric = 'risclog_logging_emails_total'
+    lines.append(f'# HELP {metric} Error e-mails by state.')
+    lines.append(f'# TYPE {metric} counter')
+    for state, value in sorted(data['emails'].items()):
+        lines.append(f'{metric}{{state="{state}"}} {value}')
+
+    metric = 'risclog_logging_duration_seconds'
+    lines.append(f'# HELP {metric} Time spent in the logging pipeline.')
+    lines.append(f'# TYPE {metric} summary')
+    for stage, timing in sorted(data['timings'].items()):
+        lines.append(
+            f'{metric}_sum{{stage="{stage}"}} {timing["total_ms"] / 1000:.9f}'
+        )
+        lines.append(f'{metric}_count{{stage="{stage}"}} {timing["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(
+    path: str, data: Optional[Dict[str, dict]] = None
+) -> None:
+    """Atomically write `render_prometheus()` to `path`."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus(data))
+    os.replace(tmp_path, path)
+
+
+class MetricsReporter(threading.Thread):
+    """Periodically log a metrics summary and/or dump a Prometheus file."""
+
+    def __init__(
+        self,
+        interval: float,
+        path: Optional[str] = None,
+        logger_name: Optional[str] = 'risclog.logging.metrics',
+    ) -> None:
+        super().__init__(name='risclog-metrics-reporter', daemon=True)
+        self.interval = interval
+        self.path = path
+        self.logger_name = logger_name
+        self._stopped = threading.Event()
+
+    def report(self) -> None:
+        data = snapshot()
+        if self.path:
+            write_prometheus(self.path, data)
+        if self.logger_name:
+            emitted = sum(
+                sum(levels.values())
+                for levels in data['records_emitted'].values()
+            )
+            dropped = sum(
+                sum(levels.values())
+                for levels in data['records_dropped'].values()
+            )
+            logging.getLogger(self.logger_name).info(
+                'logging metrics: emitted=%d dropped=%d emails=%s timings=%s',
+                emitted,
+                dropped,
+                data['emails'],
+                {
+                    stage: round(timing['total_ms'], 3)
+                    for stage, timing in data['timings'].items()
+                },
+            )
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+_reporter: Optional[MetricsReporter] = None
+
+
+def start_reporter(
+    interval: float,
+    path: Optional[str] = None,
+    logger_name: Optional[str] = 'risclog.logging.metrics',
+) -> MetricsReporter:
+    """Start the (single) periodic metrics reporter."""
+    global _reporter
+    with _registry_lock:
+        if _reporter is None or not _reporter.is_alive():
+            _reporter = MetricsReporter(interval, path, logger_name)
+            _reporter.start()
+        return _reporter
+
+
+def stop_reporter() -> None:
+    global _reporter
+    with _registry_lock:
+        if _reporter is not None:
+            _reporter.stop()
+            _reporter = None
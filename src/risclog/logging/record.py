@@ -0,0 +1,104 @@
+"""Compact event record for the `RiscLogger` fast path.
+
+`RiscLogger` hands an `EventRecord` to the stdlib handlers as `record.msg`
+instead of running structlog's processor chain, which copies and rebuilds the
+event dict several times per line. The fixed fields live in slots, only
+additional fields go into a small dict. `RiscFormatter` renders the record
+directly; other code can still read it like the former event dict.
+"""
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional, Tuple
+
+from risclog.logging.timestamps import CachedTimeStamper
+
+_KEYS_AT_END = ('referer',)
+
+format_timestamp = CachedTimeStamper().format
+
+
+def _sort_key(key: str) -> Tuple[bool, str]:
+    # Same order as `rename_event_to_message`.
+    return key in _KEYS_AT_END, key
+
+
+class EventRecord(Mapping):
+    __slots__ = (
+        'timestamp',
+        'level',
+        'logger',
+        'message',
+        'id',
+        'sender',
+        'function',
+        'script',
+        'args',
+        'extra',
+    )
+
+    def __init__(
+        self,
+        timestamp: float,
+        level: str,
+        logger: Optional[str],
+        message: Any,
+        id: Any,
+        sender: str,
+        function: Optional[str] = None,
+        script: Optional[str] = None,
+        args: tuple = (),
+        extra: Optional[dict] = None,
+    ) -> None:
+        self.timestamp = timestamp
+        self.level = level
+        self.logger = logger
+        self.message = message
+        self.id = id
+        self.sender = sender
+        self.function = function
+        self.script = script
+        self.args = args
+        self.extra = extra
+
+    def _fixed_items(self) -> Iterator[Tuple[str, Any]]:
+        if self.id is not None:
+            yield '__id', self.id
+        yield '__sender', self.sender
+        if self.function is not None:
+            yield '_function', self.function
+        if self.script is not None:
+            yield '_script', self.script
+        yield 'level', self.level
+        if self.logger is not None:
+            yield 'logger', self.logger
+        if self.message is not None:
+            yield 'message', self.message
+        if self.args:
+            yield 'positional_args', self.args
+        yield 'timestamp', format_timestamp(self.timestamp)
+
+    def to_event_dict(self) -> dict:
+        """Return the fields as event dict, in the order of the renderer."""
+        items = list(self._fixed_items())
+        if self.extra:
+            items.extend(self.extra.items())
+            items.sort(key=lambda item: _sort_key(item[0]))
+        return dict(items)
+
+    # Read-only mapping interface, for code that expects the event dict.
+
+    def __getitem__(self, key: str) -> Any:
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        for name, value in self._fixed_items():
+            if name == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_event_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_event_dict())
+
+    def __repr__(self) -> str:
+        return repr(self.to_event_dict())
@@ -0,0 +1,145 @@
+"""Flight recorder for records below the configured log level.
+
+When enabled, records that would be dropped by the level check are kept
+unrendered in a fixed-size ring buffer per asyncio task or thread. On an
+exception the buffer is flushed so the debug context that led up to the
+error ends up in the output and in the error e-mail.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, List, NamedTuple, Optional
+
+import structlog
+from risclog.logging.formatting import format_message
+
+
+class CapturedRecord(NamedTuple):
+    created: float
+    levelno: int
+    logger_name: Optional[str]
+    msg: Any
+    args: tuple
+    fields: dict
+
+
+_capacity = 0
+_buffer = contextvars.ContextVar('risclog_flight_recorder', default=None)
+_RESERVED = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message',
+    'asctime',
+}
+
+
+def enable(capacity: int = 100) -> None:
+    """Keep the last `capacity` suppressed records per task or thread."""
+    global _capacity
+    _capacity = capacity
+
+
+def disable() -> None:
+    global _capacity
+    _capacity = 0
+
+
+def is_enabled() -> bool:
+    return _capacity > 0
+
+
+def _owner() -> object:
+    # Tasks inherit a copy of the context of their creator, so the owner is
+    # stored next to the buffer to give every task a buffer of its own.
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+def _current_buffer(create: bool) -> Optional[deque]:
+    owner = _owner()
+    entry = _buffer.get()
+    if entry is not None and entry[0] == owner:
+        if entry[1].maxlen == _capacity:
+            return entry[1]
+    if not create:
+        return None
+    buffer = deque(maxlen=_capacity)
+    _buffer.set((owner, buffer))
+    return buffer
+
+
+def capture(
+    levelno: int, logger_name: Optional[str], msg: Any, args: tuple, fields
+) -> None:
+    if not _capacity:
+        return
+    context = structlog.contextvars.get_contextvars()
+    if context:
+        fields = {**context, **fields}
+    _current_buffer(create=True).append(
+        CapturedRecord(time.time(), levelno, logger_name, msg, args, fields)
+    )
+
+
+def drain() -> List[CapturedRecord]:
+    """Remove and return the records captured in the current task/thread."""
+    buffer = _current_buffer(create=False) if _capacity else None
+    if not buffer:
+        return []
+    records = list(buffer)
+    buffer.clear()
+    return records
+
+
+def _timestamp(record: CapturedRecord) -> str:
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.created))
+
+
+def format_records(records: List[CapturedRecord]) -> str:
+    lines = []
+    for record in records:
+        parts = [
+            _timestamp(record),
+            f'[{logging.getLevelName(record.levelno).lower()}]',
+            f'[{record.logger_name}]',
+        ]
+        parts.extend(f'{k}={v}' for k, v in record.fields.items())
+        parts.append(f'message={format_message(record.msg, record.args)}')
+        lines.append(' '.join(parts))
+    return '\n'.join(lines)
+
+
+def emit(records: List[CapturedRecord]) -> None:
+    """Write captured records to the handlers, bypassing the level check."""
+    for record in records:
+        logger = logging.getLogger(record.logger_name)
+        log_record = logger.makeRecord(
+            logger.name,
+            record.levelno,
+            '(flight recorder)',
+            0,
+            format_message(record.msg, record.args),
+            (),
+            None,
+            extra={
+                **{
+                    k: v
+                    for k, v in record.fields.items()
+                    if k not in _RESERVED
+                },
+                'flight_recorder': True,
+                'recorded_at': _timestamp(record),
+            },
+        )
+        log_record.created = record.created
+        logger.handle(log_record)
+
+
+def flush() -> List[CapturedRecord]:
+    records = drain()
+    emit(records)
+    return records
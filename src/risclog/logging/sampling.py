@@ -0,0 +1,197 @@
+"""Tail-based sampling of log records per request.
+
+While a request is active, records of `RiscLogger` are held in a buffer that
+lives in a context variable, like the fields bound with
+`structlog.contextvars`, so asyncio tasks and executor threads started by
+the request log into the same buffer. When the request ends, the buffer is
+written out if the request failed, was slow or logged a record of
+`error_level` or above, and otherwise only for a random `sample_rate` share
+of the requests.
+
+A request that holds more than `max_records` records writes them out and
+passes further records through, so the memory per request stays bounded and
+no lines of a possibly failing request are lost.
+
+`SamplingASGIMiddleware` and `SamplingWSGIMiddleware` wrap an application
+and treat every HTTP request as one sampling unit::
+
+    app = SamplingASGIMiddleware(app, TailSampler(sample_rate=0.05))
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import time
+from typing import Callable, Iterator, List, Optional
+
+from risclog.logging import metrics
+
+_current = contextvars.ContextVar('risclog_sampling_request', default=None)
+
+
+class Request:
+    """Records and outcome of one sampled request."""
+
+    __slots__ = ('sampler', 'records', 'start', 'status', 'failed', 'token')
+
+    def __init__(self, sampler: 'TailSampler') -> None:
+        self.sampler = sampler
+        self.records: Optional[List[logging.LogRecord]] = []
+        self.start = time.perf_counter()
+        self.status: Optional[int] = None
+        self.failed = False
+        self.token = None
+
+    def hold(self, record: logging.LogRecord) -> bool:
+        records = self.records
+        if records is None:
+            return False
+        if record.levelno >= self.sampler.error_level:
+            self.failed = True
+        records.append(record)
+        if len(records) >= self.sampler.max_records:
+            self.release()
+        return True
+
+    def release(self) -> None:
+        """Write out the held records and pass further records through."""
+        records, self.records = self.records, None
+        for record in records or ():
+            logging.getLogger(record.name).handle(record)
+            metrics.increment(
+                'records_emitted', record.levelname.lower(), record.name
+            )
+
+    def discard(self) -> None:
+        records, self.records = self.records, None
+        for record in records or ():
+            metrics.increment(
+                'records_dropped', record.levelname.lower(), record.name
+            )
+
+
+class TailSampler:
+    def __init__(
+        self,
+        sample_rate: float = 0.01,
+        slow_threshold: float = 1.0,
+        error_level: int = logging.ERROR,
+        error_status: int = 500,
+        max_records: int = 1000,
+        random: Callable[[], float] = random.random,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.error_level = error_level
+        self.error_status = error_status
+        self.max_records = max_records
+        self.random = random
+
+    def begin(self) -> Request:
+        request = Request(self)
+        request.token = _current.set(request)
+        return request
+
+    def keep(self, request: Request) -> bool:
+        return (
+            request.failed
+            or (
+                request.status is not None
+                and request.status >= self.error_status
+            )
+            or time.perf_counter() - request.start >= self.slow_threshold
+            or self.random() < self.sample_rate
+        )
+
+    def end(self, request: Request) -> None:
+        try:
+            _current.reset(request.token)
+        except ValueError:
+            # Ended in another context than it began in.
+            _current.set(None)
+        if self.keep(request):
+            request.release()
+        else:
+            request.discard()
+
+    @contextlib.contextmanager
+    def request(self) -> Iterator[Request]:
+        """Sample the records logged inside the block as one request."""
+        request = self.begin()
+        try:
+            yield request
+        except BaseException:
+            request.failed = True
+            raise
+        finally:
+            self.end(request)
+
+
+def hold(record: logging.LogRecord) -> bool:
+    """Hold `record` if a sampled request is active."""
+    request = _current.get()
+    return request is not None and request.hold(record)
+
+
+class SamplingASGIMiddleware:
+    def __init__(self, app, sampler: Optional[TailSampler] = None) -> None:
+        self.app = app
+        self.sampler = sampler or TailSampler()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with self.sampler.request() as request:
+
+            async def send_with_status(message) -> None:
+                if message['type'] == 'http.response.start':
+                    request.status = message['status']
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+
+class _WSGIResponse:
+    def __init__(self, result, sampler: TailSampler, request: Request):
+        self.result = result
+        self.sampler = sampler
+        self.request = request
+
+    def __iter__(self):
+        try:
+            yield from self.result
+        except BaseException:
+            self.request.failed = True
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self.result, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.sampler.end(self.request)
+
+
+class SamplingWSGIMiddleware:
+    def __init__(self, app, sampler: Optional[TailSampler] = None) -> None:
+        self.app = app
+        self.sampler = sampler or TailSampler()
+
+    def __call__(self, environ, start_response):
+        request = self.sampler.begin()
+
+        def start_response_with_status(status, headers, exc_info=None):
+            request.status = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        try:
+            result = self.app(environ, start_response_with_status)
+        except BaseException:
+            request.failed = True
+            self.sampler.end(request)
+            raise
+        # The request ends when the server closes the response.
+        return _WSGIResponse(result, self.sampler, request)
@@ -0,0 +1,303 @@
+"""Ship log records to a local collector over a persistent socket.
+
+`ShippingHandler` keeps one TCP or Unix domain socket connection open and
+sends records in batches from a background thread, either as newline
+delimited JSON or as RFC 5424 syslog messages (with RFC 6587 octet counting
+framing). While the collector is unreachable, records are buffered in memory
+up to `max_buffer_bytes` and spilled to `spill_path` beyond that; the
+connection is retried with exponential backoff. A forked child drops the
+inherited connection and buffer and starts its own sender thread.
+"""
+import collections
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import weakref
+from typing import Deque, Optional, Tuple
+from urllib.parse import urlsplit
+
+from risclog.logging import metrics
+
+SYSLOG_SEVERITIES = {
+    logging.DEBUG: 7,
+    logging.INFO: 6,
+    logging.WARNING: 4,
+    logging.ERROR: 3,
+    logging.CRITICAL: 2,
+}
+SYSLOG_FACILITY_USER = 1
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """Parse ``tcp://host:port`` or ``unix:///path`` into family, address."""
+    url = urlsplit(address)
+    if url.scheme == 'tcp' and url.hostname and url.port:
+        return socket.AF_INET, (url.hostname, url.port)
+    if url.scheme == 'unix' and url.path:
+        return socket.AF_UNIX, url.path
+    raise ValueError(f'Unsupported log shipping address: {address!r}')
+
+
+class ShippingHandler(logging.Handler):
+    _instances = weakref.WeakSet()
+
+    def __init__(
+        self,
+        address: str,
+        protocol: str = 'json',
+        batch_size: int = 256,
+        interval: float = 0.5,
+        max_buffer_bytes: int = 8 * 1024 * 1024,
+        spill_path: Optional[str] = None,
+        max_spill_bytes: int = 256 * 1024 * 1024,
+        backoff: float = 0.1,
+        max_backoff: float = 30.0,
+        app_name: str = 'risclog',
+    ) -> None:
+        if protocol not in ('json', 'syslog'):
+            raise ValueError(f'Unsupported log shipping protocol: {protocol}')
+        super().__init__()
+        self.family, self.address = parse_address(address)
+        self.protocol = protocol
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.spill_path = spill_path
+        self.max_spill_bytes = max_spill_bytes
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.app_name = app_name
+        self.hostname = socket.gethostname() or '-'
+
+        # Encoded records with level and logger name, for the metrics.
+        self._buffer: Deque[Tuple[bytes, str, str]] = collections.deque()
+        self._buffer_bytes = 0
+        self._condition = threading.Condition(threading.Lock())
+        self._socket: Optional[socket.socket] = None
+        self._delay = 0.0
+        self._closed = False
+        self._spilling = False
+        self._start_sender()
+        self._instances.add(self)
+
+    def _start_sender(self) -> None:
+        self._sender = threading.Thread(
+            target=self._run, name='risclog-log-shipping', daemon=True
+        )
+        self._sender.start()
+
+    # Encoding
+
+    def encode(self, record: logging.LogRecord) -> bytes:
+        line = self.format(record).replace('\n', '\\n')
+        if self.protocol == 'json':
+            return line.encode('utf-8') + b'\n'
+        severity = SYSLOG_SEVERITIES.get(record.levelno, 6)
+        timestamp = (
+            datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            )
+            .isoformat(timespec='microseconds')
+            .replace('+00:00', 'Z')
+        )
+        message = (
+            f'<{SYSLOG_FACILITY_USER * 8 + severity}>1 {timestamp} '
+            f'{self.hostname} {self.app_name} {record.process or "-"} '
+            f'{record.name or "-"} - {line}'
+        ).encode('utf-8')
+        return b'%d %s' % (len(message), message)
+
+    # Buffering
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            data = self.encode(record)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+            return
+        level = record.levelname.lower()
+        with self._condition:
+            if (
+                self._spilling
+                or self._buffer_bytes + len(data) > self.max_buffer_bytes
+            ):
+                # Once records go to disk, later records follow them there
+                # until the spill file is drained, to keep the order.
+                if not self._spill([data]):
+                    metrics.increment('records_dropped', level, record.name)
+                return
+            self._buffer.append((data, level, record.name))
+            self._buffer_bytes += len(data)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def _spill(self, chunks) -> bool:
+        if not self.spill_path:
+            return False
+        size = sum(len(chunk) for chunk in chunks)
+        try:
+            current = os.path.getsize(self.spill_path)
+        except OSError:
+            current = 0
+        if current + size > self.max_spill_bytes:
+            return False
+        with open(self.spill_path, 'ab') as f:
+            f.writelines(chunks)
+        self._spilling = True
+        return True
+
+    def _take_batch(self):
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            entry = self._buffer.popleft()
+            self._buffer_bytes -= len(entry[0])
+            batch.append(entry)
+        return batch
+
+    def _requeue(self, batch) -> None:
+        for entry in reversed(batch):
+            self._buffer.appendleft(entry)
+            self._buffer_bytes += len(entry[0])
+
+    # Sending
+
+    def _connect(self) -> socket.socket:
+        if self._socket is None:
+            if self.family == socket.AF_UNIX:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.settimeout(5)
+                    sock.connect(self.address)
+                except OSError:
+                    sock.close()
+                    raise
+            else:
+                sock = socket.create_connection(self.address, timeout=5)
+            self._socket = sock
+        return self._socket
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _send_spilled(self, sock: socket.socket) -> None:
+        if not self.spill_path:
+            return
+        sending = f'{self.spill_path}.sending'
+        with self._condition:
+            if not os.path.exists(sending):
+                if not os.path.exists(self.spill_path):
+                    self._spilling = False
+                    return
+                os.replace(self.spill_path, sending)
+        # Records are sent at least once: if sending fails half way, the
+        # whole file is sent again after reconnecting.
+        with open(sending, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                sock.sendall(chunk)
+        os.remove(sending)
+
+    def _send(self, batch, send_spilled: bool) -> bool:
+        try:
+            sock = self._connect()
+            if batch:
+                sock.sendall(b''.join(entry[0] for entry in batch))
+                batch.clear()
+            if send_spilled:
+                self._send_spilled(sock)
+        except OSError:
+            self._disconnect()
+            self._delay = min(
+                max(self._delay * 2, self.backoff), self.max_backoff
+            )
+            return False
+        self._delay = 0.0
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed:
+                    self._condition.wait(self._delay or self.interval)
+                batch = self._take_batch()
+                # Spilled records are newer than the ones in memory.
+                send_spilled = self._spilling and not self._buffer
+                closed = self._closed
+            if batch or send_spilled or not closed:
+                if not self._send(batch, send_spilled):
+                    with self._condition:
+                        self._requeue(batch)
+                    if closed:
+                        return
+                    continue
+            with self._condition:
+                if closed and not self._buffer and not self._spilling:
+                    return
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wake the sender and wait (up to `timeout`) for an empty buffer.
+
+        Returns early while the collector is unreachable, so that
+        `logging.shutdown` does not hold up the exit of the process.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._condition:
+                if not self._buffer and not self._spilling:
+                    return
+                if self._delay:
+                    # Disconnected and backing off.
+                    return
+                self._condition.notify()
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._sender.join(timeout=5)
+        with self._condition:
+            # Whatever could not be delivered goes to disk or is dropped.
+            if self._buffer and not self._spill(
+                [entry[0] for entry in self._buffer]
+            ):
+                for _, level, name in self._buffer:
+                    metrics.increment('records_dropped', level, name)
+            self._buffer.clear()
+            self._buffer_bytes = 0
+        self._disconnect()
+        super().close()
+
+    def _after_fork_in_child(self) -> None:
+        # The buffer, the spill file and the connection belong to the
+        # parent. Closing the inherited descriptor leaves its connection
+        # open, while shutting the socket down would end it.
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+        self._buffer, self._buffer_bytes = collections.deque(), 0
+        self._condition = threading.Condition(threading.Lock())
+        self._delay = 0.0
+        self._spilling = False
+        if not self._closed:
+            self._start_sender()
+
+
+def _reset_after_fork() -> None:
+    for handler in list(ShippingHandler._instances):
+        handler._after_fork_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,98 @@
+import logging
+
+import httpx
+import pytest
+import structlog
+from risclog.logging import RiscLogger
+from risclog.logging.access import AccessLogMiddleware
+
+
+@pytest.fixture
+def handler(handler):
+    handler.addFilter(lambda record: record.name == 'uvicorn.access')
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.INFO)
+    yield handler
+    root.setLevel(level)
+
+
+async def app(scope, receive, send):
+    if scope['path'] == '/error':
+        raise RuntimeError('failure')
+    await send({'type': 'http.response.start', 'status': 201, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'hello'})
+
+
+async def get(middleware, url):
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://test'
+    ) as client:
+        return await client.get(url)
+
+
+@pytest.mark.asyncio
+async def test_writes_one_compact_line_per_request(handler):
+    response = await get(AccessLogMiddleware(app), '/items?page=2')
+
+    assert response.status_code == 201
+    (record,) = handler.records
+    assert record.name == 'uvicorn.access'
+    assert record.levelno == logging.INFO
+    assert record.msg.message.startswith(
+        '127.0.0.1:123 - "GET /items?page=2 HTTP/1.1" 201 5B '
+    )
+    assert record.msg.message.endswith('ms')
+    assert record.msg.extra is None
+
+
+@pytest.mark.asyncio
+async def test_fields(handler):
+    await get(AccessLogMiddleware(app, fields=True), '/items')
+
+    fields = handler.records[0].msg.extra
+    assert fields['method'] == 'GET'
+    assert fields['path'] == '/items'
+    assert fields['status'] == 201
+    assert fields['bytes'] == 5
+    assert fields['duration_ms'] >= 0
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_logged_as_500(handler):
+    with pytest.raises(RuntimeError):
+        await get(AccessLogMiddleware(app), '/error')
+
+    assert '"GET /error HTTP/1.1" 500 0B' in handler.records[0].msg.message
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_logged_below_configured_level(handler):
+    logging.getLogger().setLevel(logging.WARNING)
+
+    await get(AccessLogMiddleware(app), '/items')
+
+    assert handler.records == []
+
+
+def test_rendered_by_the_configured_formatter(handler):
+    formatter = RiscLogger._create_formatter(
+        structlog.dev.ConsoleRenderer(colors=False)
+    )
+    AccessLogMiddleware(app).log(
+        {
+            'method': 'POST',
+            'path': '/items',
+            'http_version': '1.1',
+            'client': ('10.0.0.1', 80),
+        },
+        200,
+        2,
+        0.0015,
+    )
+
+    assert formatter.format(handler.records[0]).endswith(
+        '[info     ] [uvicorn.access] __sender=access_log '
+        'message=10.0.0.1:80 - "POST /items HTTP/1.1" 200 2B 1.50ms'
+    )
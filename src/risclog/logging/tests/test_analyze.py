@@ -0,0 +1,134 @@
+import bz2
+import gzip
+import json
+import lzma
+
+import pytest
+from risclog.logging import analyze
+
+COLORED = (
+    '\x1b[2m2024-08-05 11:38:51\x1b[0m [\x1b[32m\x1b[1minfo     \x1b[0m] '
+    '[\x1b[0m\x1b[1m\x1b[34mexample\x1b[0m]\x1b[0m \x1b[36m__id\x1b[0m='
+    '\x1b[35m17\x1b[0m \x1b[36m__sender\x1b[0m=\x1b[35mlogging_decorator'
+    '\x1b[0m \x1b[36mmessage\x1b[0m=\x1b[35mMethod "fetch" called with no '
+    'arguments.\x1b[0m'
+)
+
+LOG = '''\
+2024-08-05 11:38:51.250 [info     ] [example] __id=1 __sender=logging_decorator _function=fetch _script=example.py message=Method called: "fetch" with: "{'arg_0': 'a b=c'}"
+2024-08-05 11:38:51 [info     ] [example] __id=1 __sender=inline _function=fetch _script=example.py message=fetching user=x
+2024-08-05 11:38:53.500 [info     ] [example] __id=1 __sender=logging_decorator _function=fetch _script=example.py message=Method "fetch" returned: "data"
+2024-08-05 11:38:53 [info     ] [example] __id=1 __sender=logging_decorator message=Method called: "fetch" with: "{}"
+Traceback lines and other output are skipped
+2024-08-05 11:38:54 [error    ] [example] __id=1 __sender=logging_decorator message=Exception occurred in method: fetch, exception: boom
+2024-08-05 11:38:54 [info     ] [example] __id=2 __sender=logging_decorator _function=main message=Method "main" called with no arguments.
+{"__id": 3, "__sender": "logging_decorator", "message": "method called", "function": "fast", "timestamp": "2024-08-05 11:38:55"}
+{"__id": 3, "__sender": "logging_decorator", "message": "method returned", "function": "fast", "duration_ms": 1.5, "timestamp": "2024-08-05 11:38:55"}
+'''
+
+
+def test_parse_colored_console_line():
+    fields = analyze.parse_line(COLORED)
+
+    assert fields == {
+        'timestamp': '2024-08-05 11:38:51',
+        'level': 'info',
+        'logger': 'example',
+        '__id': '17',
+        '__sender': 'logging_decorator',
+        'message': 'Method "fetch" called with no arguments.',
+    }
+    assert analyze.event_kind(fields) == 'call'
+    assert analyze.function_name(fields) == 'fetch'
+
+
+def test_message_keeps_unknown_key_value_pairs():
+    fields = analyze.parse_line(LOG.splitlines()[0])
+
+    assert fields['message'] == (
+        'Method called: "fetch" with: "{\'arg_0\': \'a b=c\'}"'
+    )
+
+
+def test_parse_other_lines():
+    assert analyze.parse_line('Traceback (most recent call last):') is None
+    assert analyze.parse_line('{broken') is None
+
+
+@pytest.mark.parametrize(
+    'suffix, opener',
+    [
+        ('', open),
+        ('.gz', gzip.open),
+        ('.bz2', bz2.open),
+        ('.xz', lzma.open),
+    ],
+)
+def test_analyze_reconstructs_spans(tmp_path, suffix, opener):
+    path = tmp_path / f'app.log{suffix}'
+    with opener(path, 'wt') as f:
+        f.write(LOG)
+
+    report = analyze.analyze([str(path)]).report()
+
+    assert report['lines'] == 8
+    fetch = report['functions']['fetch']
+    assert fetch['calls'] == 2
+    assert fetch['errors'] == 1
+    assert fetch['inline_lines'] == 1
+    # The second call only has timestamps in whole seconds.
+    assert fetch['p50_ms'] == 2250.0
+    assert fetch['max_ms'] == 2250.0
+    assert report['functions']['fast']['p99_ms'] == 1.5
+    (unmatched,) = report['unmatched']
+    assert unmatched['function'] == 'main'
+    assert unmatched['id'] == '2'
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.log'
+    path.write_text('')
+
+    assert analyze.analyze([str(path)]).report()['lines'] == 0
+
+
+def test_durations_are_sampled_with_bounded_memory(monkeypatch):
+    monkeypatch.setattr(analyze, 'MAX_SAMPLES', 10)
+    analyzer = analyze.Analyzer()
+    for i in range(100):
+        analyzer.feed(
+            {
+                '__id': 1,
+                '__sender': 'logging_decorator',
+                'message': 'method called',
+                'function': 'f',
+            }
+        )
+        analyzer.feed(
+            {
+                '__id': 1,
+                '__sender': 'logging_decorator',
+                'message': 'method returned',
+                'function': 'f',
+                'duration_ms': i,
+            }
+        )
+
+    stats = analyzer.functions['f']
+    assert len(stats.samples) == 10
+    assert stats.count == 100
+    assert stats.max == 99
+
+
+def test_main(tmp_path, capsys):
+    path = tmp_path / 'app.log'
+    path.write_text(LOG)
+
+    assert analyze.main([str(path)]) == 0
+    output = capsys.readouterr().out
+    assert 'fetch' in output
+    assert 'Unmatched calls: 1' in output
+
+    assert analyze.main([str(path), '--json']) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['functions']['fetch']['calls'] == 2
@@ -0,0 +1,52 @@
+import json
+
+from risclog.logging import benchmark
+
+
+def test_run_benchmark_returns_results_for_all_benchmarks():
+    result = benchmark.run(number=4, repeat=1)
+
+    assert set(result['results']) == set(benchmark.BENCHMARKS)
+    for entry in result['results'].values():
+        assert entry['best_us'] > 0
+        assert entry['ops_per_sec'] > 0
+
+
+def test_compare_reports_regressions():
+    baseline = {'results': {'a': {'best_us': 10.0}, 'b': {'best_us': 10.0}}}
+    current = {
+        'results': {
+            'a': {'best_us': 10.5},
+            'b': {'best_us': 12.0},
+            'c': {'best_us': 1.0},
+        }
+    }
+
+    assert benchmark.compare(current, baseline, threshold=0.1) == ['b']
+
+
+def test_main_writes_json_and_fails_on_regression(tmp_path, capsys):
+    output = tmp_path / 'current.json'
+    assert (
+        benchmark.main(['sync_info', '-n', '5', '-r', '1', '-o', str(output)])
+        == 0
+    )
+    data = json.loads(output.read_text())
+    assert 'sync_info' in data['results']
+
+    data['results']['sync_info']['best_us'] = 1e-6
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(data))
+    assert (
+        benchmark.main(
+            ['sync_info', '-n', '5', '-r', '1', '-c', str(baseline)]
+        )
+        == 1
+    )
+    assert 'Regressions: sync_info' in capsys.readouterr().err
+
+
+def test_run_measures_peak_memory_on_request():
+    result = benchmark.run(['sync_info'], number=4, repeat=1, memory=True)
+
+    assert result['results']['sync_info']['peak_bytes'] > 0
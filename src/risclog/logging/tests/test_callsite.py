@@ -0,0 +1,138 @@
+import functools
+import logging
+import sys
+
+import pytest
+from risclog.logging import callsite
+
+# Code objects know their qualified name since Python 3.11.
+HAS_QUALNAME = sys.version_info >= (3, 11)
+
+
+class First:
+    def run(self):
+        return callsite.for_frame(sys._getframe())
+
+
+class Second:
+    def run(self):
+        return callsite.for_frame(sys._getframe())
+
+
+@pytest.fixture
+def callsite_fields():
+    callsite.enable()
+    yield
+    callsite.disable()
+
+
+def test_id_is_stable_and_distinguishes_same_names():
+    first, second = First().run(), Second().run()
+
+    assert first.id != second.id
+    assert len(first.id) == 16
+    if HAS_QUALNAME:
+        assert first.id == callsite.callsite_id(
+            __name__, f'First.run:{First.run.__code__.co_firstlineno}'
+        )
+        assert first.qualname == 'First.run'
+    assert first.module == __name__
+    assert first.file == __file__
+
+
+def test_same_qualified_names_get_different_ids():
+    class Item:
+        @property
+        def value(self):
+            pass
+
+        @value.setter
+        def value(self, value):
+            pass
+
+    first = lambda: None  # noqa: E731
+    second = lambda: None  # noqa: E731
+
+    assert (
+        callsite.for_function(Item.value.fget).id
+        != callsite.for_function(Item.value.fset).id
+    )
+    assert callsite.for_function(first).id != callsite.for_function(second).id
+
+
+def test_callsites_are_cached_per_code_object():
+    assert First().run() is First().run()
+
+
+def test_function_and_its_frames_share_the_callsite():
+    def decorated():
+        return callsite.for_frame(sys._getframe())
+
+    @functools.wraps(decorated)
+    def wrapper():
+        return decorated()
+
+    assert callsite.for_function(wrapper) == decorated()
+
+
+def test_callables_without_code():
+    site = callsite.for_function(functools.partial(print))
+
+    assert site.file == '?'
+    assert callsite.fields(site)['_qualname'] == site.qualname
+
+
+def test_fields_are_added_when_enabled(logger1, caplog, callsite_fields):
+    with caplog.at_level(logging.INFO):
+        logger1.info('with callsite')
+        line = sys._getframe().f_lineno - 1
+
+    fields = caplog.records[0].msg
+    assert fields['_module'] == __name__
+    assert fields['_qualname'] == 'test_fields_are_added_when_enabled'
+    assert fields['_file'] == __file__
+    assert fields['_line'] == line
+
+
+def test_decorator_lines_point_to_the_decorated_function(
+    logger1, caplog, callsite_fields
+):
+    @logger1.decorator
+    def decorated():
+        return None
+
+    with caplog.at_level(logging.INFO):
+        decorated()
+
+    qualnames = {record.msg['_qualname'] for record in caplog.records}
+    assert qualnames == {
+        'test_decorator_lines_point_to_the_decorated_function.'
+        '<locals>.decorated'
+    }
+
+
+def test_decorator_fields_survive_cache_eviction(
+    logger1, caplog, callsite_fields, monkeypatch
+):
+    @logger1.decorator
+    def decorated():
+        return None
+
+    monkeypatch.setattr(callsite, 'MAX_CACHED_CALLSITES', 1)
+    callsite.clear_cache()
+    First().run()
+    Second().run()
+
+    with caplog.at_level(logging.INFO):
+        decorated()
+
+    assert [record.msg['_qualname'] for record in caplog.records] == [
+        'test_decorator_fields_survive_cache_eviction.<locals>.decorated'
+    ] * 2
+
+
+def test_no_fields_by_default(logger1, caplog):
+    with caplog.at_level(logging.INFO):
+        logger1.info('without callsite')
+
+    assert '_module' not in caplog.records[0].msg
@@ -0,0 +1,109 @@
+import collections
+import logging
+import re
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+import structlog
+from risclog.logging import RiscLogger, get_logger
+from risclog.logging.handlers import BatchingStreamHandler, RiscStreamHandler
+
+THREADS = 64
+LINES = 100
+LINE = re.compile(r' message=stress seq=(\d+) thread=(\d+)$')
+
+
+@pytest.mark.parametrize(
+    'handler_class', [RiscStreamHandler, BatchingStreamHandler]
+)
+def test_no_lines_are_lost_or_torn(tmp_path, handler_class):
+    path = tmp_path / 'stress.log'
+    # The first logger configures logging, which resets all handlers.
+    get_logger('risclog.stress')
+    target = logging.getLogger('risclog.stress')
+    barrier = threading.Barrier(THREADS)
+
+    def work(number):
+        # Creating loggers concurrently must not drop the handler below.
+        logger = get_logger('risclog.stress')
+        barrier.wait()
+        for seq in range(LINES):
+            logger.info('stress', thread=number, seq=seq, method_id=number)
+
+    with open(path, 'w') as stream:
+        handler = handler_class(stream)
+        handler.setFormatter(
+            RiscLogger._create_formatter(
+                structlog.dev.ConsoleRenderer(colors=False)
+            )
+        )
+        target.addHandler(handler)
+        target.setLevel(logging.INFO)
+        target.propagate = False
+        try:
+            threads = [
+                threading.Thread(target=work, args=(number,))
+                for number in range(THREADS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            target.removeHandler(handler)
+            target.setLevel(logging.NOTSET)
+            target.propagate = True
+            handler.close()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == THREADS * LINES
+    seen = collections.defaultdict(list)
+    for line in lines:
+        match = LINE.search(line)
+        assert match, line
+        seen[int(match.group(2))].append(int(match.group(1)))
+    assert sorted(seen) == list(range(THREADS))
+    for seqs in seen.values():
+        assert seqs == list(range(LINES))
+
+
+def test_configuration_happens_once(logger1):
+    root_handlers = list(logging.getLogger().handlers)
+    named = logging.getLogger('risclog.configured')
+    handler = logging.NullHandler()
+    named.addHandler(handler)
+    try:
+        get_logger('risclog.configured')
+        RiscLogger._configure_logger()
+
+        assert named.handlers == [handler]
+        assert logging.getLogger().handlers == root_handlers
+    finally:
+        named.removeHandler(handler)
+
+
+def test_level_check_does_not_take_the_logging_lock(logger1):
+    # Manager.getLogger serializes all threads on logging's module lock.
+    with patch.object(
+        logging.Logger.manager, 'getLogger', side_effect=AssertionError
+    ):
+        logger1.debug('disabled or not')
+        logger1.info('enabled')
+
+
+def test_logging_from_a_subinterpreter():
+    interpreters = pytest.importorskip('_xxsubinterpreters')
+    interpreter = interpreters.create()
+    try:
+        interpreters.run_string(
+            interpreter,
+            'import sys\n'
+            f'sys.path[:] = {sys.path!r}\n'
+            'import risclog.logging\n'
+            "logger = risclog.logging.get_logger('risclog.sub')\n"
+            "logger.debug('from a subinterpreter %s', 1)\n",
+        )
+    finally:
+        interpreters.destroy(interpreter)
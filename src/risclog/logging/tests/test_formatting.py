@@ -0,0 +1,91 @@
+import logging
+
+import pytest
+import structlog
+from risclog.logging import Lazy, RiscLogger
+from risclog.logging.formatting import format_message
+
+
+@pytest.fixture
+def render():
+    formatter = RiscLogger._create_formatter(
+        structlog.dev.ConsoleRenderer(colors=False)
+    )
+    return formatter.format
+
+
+def test_format_message_percent_style():
+    assert format_message('%s + %d', ('a', 2)) == 'a + 2'
+    assert format_message('%(name)s', ({'name': 'value'},)) == 'value'
+
+
+def test_format_message_brace_style():
+    assert format_message('{} + {}', ('a', 2)) == 'a + 2'
+    assert format_message('{name}', ({'name': 'value'},)) == 'value'
+
+
+def test_format_message_mixed_styles():
+    assert (
+        format_message('Done 100% for {} items', (42,))
+        == 'Done 100% for 42 items'
+    )
+    assert format_message('%s of {x', ('one',)) == 'one of {x'
+    assert format_message('{"id": %(id)s}', ({'id': 1},)) == '{"id": 1}'
+
+
+def test_format_message_resolves_lazy_args():
+    assert format_message('%s', (Lazy(lambda: 'computed'),)) == 'computed'
+
+
+def test_format_message_does_not_raise_on_mismatch():
+    assert format_message('%s %s', ('only one',)) == "%s %s ('only one',)"
+
+
+def test_positional_args_are_formatted_in_the_formatter(
+    logger1, caplog, render
+):
+    with caplog.at_level(logging.INFO):
+        logger1.info('Hello %s, you are %d', 'world', 42)
+        logger1.info('Hello {}', 'brace')
+
+    first, second = caplog.records
+    assert first.msg['message'] == 'Hello %s, you are %d'
+    assert first.msg['positional_args'] == ('world', 42)
+    assert '__id' in first.msg
+    assert 'message=Hello world, you are 42' in render(first)
+    assert 'positional_args' not in render(first)
+    assert 'message=Hello brace' in render(second)
+
+
+@pytest.mark.asyncio
+async def test_async_positional_args(logger1, caplog, render):
+    with caplog.at_level(logging.INFO):
+        await logger1.warning('async %s', 'args')
+
+    assert 'message=async args' in render(caplog.records[0])
+
+
+def test_lazy_values_are_not_evaluated_below_the_level(logger1, caplog):
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return 'expensive'
+
+    with caplog.at_level(logging.INFO):
+        logger1.debug('value: %s', Lazy(expensive), detail=Lazy(expensive))
+
+    assert calls == []
+    assert caplog.records == []
+
+
+def test_lazy_fields_are_evaluated_in_the_formatter(logger1, caplog, render):
+    with caplog.at_level(logging.INFO):
+        logger1.info(
+            'value: %s', Lazy(lambda: 'arg'), detail=Lazy(lambda: 'field')
+        )
+
+    assert isinstance(caplog.records[0].msg['detail'], Lazy)
+    output = render(caplog.records[0])
+    assert 'message=value: arg' in output
+    assert 'detail=field' in output
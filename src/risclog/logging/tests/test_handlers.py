@@ -0,0 +1,111 @@
+import io
+import logging
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from risclog.logging import handlers
+
+
+def make_record(msg, level=logging.INFO):
+    return logging.LogRecord('test', level, '', 0, msg, (), None)
+
+
+@pytest.fixture
+def pipe():
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(write_fd, 'w') as stream, os.fdopen(read_fd, 'rb') as out:
+        yield stream, out
+
+
+def test_lines_are_buffered_until_batch_size(pipe):
+    stream, out = pipe
+    handler = handlers.BatchingStreamHandler(stream, batch_size=20)
+
+    with patch.object(os, 'writev', wraps=os.writev) as writev:
+        handler.handle(make_record('line 1'))
+        handler.handle(make_record('line 2'))
+        assert writev.call_count == 0
+        handler.handle(make_record('line 3'))
+        assert writev.call_count == 1
+
+    assert os.read(out.fileno(), 100) == b'line 1\nline 2\nline 3\n'
+    handler.close()
+
+
+def test_error_records_are_flushed_immediately(pipe):
+    stream, out = pipe
+    handler = handlers.BatchingStreamHandler(stream, batch_size=1 << 20)
+
+    handler.handle(make_record('info'))
+    handler.handle(make_record('error', level=logging.ERROR))
+
+    assert os.read(out.fileno(), 100) == b'info\nerror\n'
+    handler.close()
+
+
+def test_buffer_is_flushed_after_interval(pipe):
+    stream, out = pipe
+    handler = handlers.BatchingStreamHandler(
+        stream, batch_size=1 << 20, interval=0.01
+    )
+
+    handler.handle(make_record('delayed'))
+    time.sleep(0.2)
+
+    assert os.read(out.fileno(), 100) == b'delayed\n'
+    handler.close()
+
+
+def test_streams_without_file_descriptor():
+    stream = io.StringIO()
+    handler = handlers.BatchingStreamHandler(stream, batch_size=1 << 20)
+
+    handler.handle(make_record('first'))
+    assert stream.getvalue() == ''
+    handler.close()
+
+    assert stream.getvalue() == 'first\n'
+
+
+def test_large_batches_are_split_into_iov_max_groups(pipe, monkeypatch):
+    stream, out = pipe
+    monkeypatch.setattr(handlers, 'IOV_MAX', 2)
+    handler = handlers.BatchingStreamHandler(stream, batch_size=1 << 20)
+
+    for i in range(5):
+        handler.handle(make_record(str(i)))
+    handler.flush()
+
+    assert os.read(out.fileno(), 100) == b'0\n1\n2\n3\n4\n'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_buffer_is_flushed_on_shutdown_and_fork():
+    script = '''
+import logging, os, sys
+from risclog.logging.handlers import BatchingStreamHandler
+
+handler = BatchingStreamHandler(sys.stdout, batch_size=1 << 20, interval=60)
+logging.getLogger().addHandler(handler)
+logging.getLogger().setLevel(logging.INFO)
+logging.info('before fork')
+pid = os.fork()
+if pid == 0:
+    logging.info('child')
+    logging.shutdown()
+    os._exit(0)
+os.waitpid(pid, 0)
+logging.info('parent')
+'''
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.splitlines() == ['before fork', 'child', 'parent']
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+# Import time budgets relative to the import of structlog in the same run,
+# so they hold on slower machines: the risclog.logging modules themselves
+# (measured at about 1x) and including all dependencies (about 4x, mostly
+# asyncio). The lazy imports below are the main guard, these only catch
+# large regressions.
+OWN_IMPORT_BUDGET = 2
+IMPORT_BUDGET = 6
+LAZY_MODULES = ('smtplib', 'email.mime', 'risclog.logging.shipping')
+
+
+def import_times(statement):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:') :].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def test_get_logger_import_does_not_load_email_machinery():
+    times = import_times('from risclog.logging import get_logger')
+
+    assert 'risclog.logging' in times
+    for name in times:
+        assert not name.startswith(LAZY_MODULES), f'{name} imported eagerly'
+
+
+def test_get_logger_import_time_budget():
+    times = min(
+        (
+            import_times('from risclog.logging import get_logger')
+            for _ in range(3)
+        ),
+        key=lambda times: times['risclog.logging'][1],
+    )
+
+    own = sum(
+        self_us
+        for name, (self_us, _) in times.items()
+        if name.startswith('risclog.logging')
+    )
+    cumulative = times['risclog.logging'][1]
+    reference = times['structlog'][1]
+    assert (
+        own < OWN_IMPORT_BUDGET * reference
+    ), f'own import time: {own} us, structlog: {reference} us'
+    assert (
+        cumulative < IMPORT_BUDGET * reference
+    ), f'import time: {cumulative} us, structlog: {reference} us'
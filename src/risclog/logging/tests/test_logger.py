@@ -1,5 +1,6 @@
 import logging
 import sys
+from collections.abc import Mapping
 from unittest.mock import patch
 
 import pytest
@@ -85,7 +86,7 @@ def test_structlog_logger_name(logger1, logger2, caplog):
 
     logger_names = []
     for record in caplog.records:
-        event_dict = record.msg if isinstance(record.msg, dict) else {}
+        event_dict = record.msg if isinstance(record.msg, Mapping) else {}
         if 'logger' in event_dict:
             logger_names.append(event_dict['logger'])
 
@@ -407,3 +408,102 @@ def test_inline_and_decorator_have_same_id_in_logs(logger1, caplog):
     ]
     assert len(log_records) == 3
     assert len({r.msg['__id'] for r in log_records}) == 1
+
+
+def test_structured_decorator_logs_fields(logger1, caplog):
+    @logger1.decorator(structured=True)
+    def structured_func(a, flag=False):
+        return [a, flag]
+
+    with caplog.at_level(logging.INFO):
+        assert structured_func(1, flag=True) == [1, True]
+
+    called, returned = (record.msg for record in caplog.records)
+    assert called['message'] == 'method called'
+    assert called['function'] == 'structured_func'
+    assert called['args'] == {'arg_0': 1, 'flag': True}
+    assert returned['message'] == 'method returned'
+    assert returned['outcome'] == 'success'
+    assert returned['result_type'] == 'list'
+    assert returned['result_len'] == 2
+    assert returned['duration_ms'] >= 0
+
+
+def test_decorator_does_not_format_below_the_level(logger1, caplog):
+    calls = []
+
+    class Value:
+        def __repr__(self):
+            calls.append('repr')
+            return 'value'
+
+        __str__ = __repr__
+
+    @logger1.decorator
+    def func(value):
+        return value
+
+    logger = logging.getLogger(func.__module__)
+    logger.setLevel(logging.WARNING)
+    try:
+        for _ in range(5):
+            func(Value())
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+    assert calls == []
+    assert caplog.records == []
+
+
+def test_structured_decorator_does_not_call_len_of_other_types(
+    logger1, caplog
+):
+    class LazyResult:
+        def __len__(self):
+            raise RuntimeError('evaluated')
+
+    @logger1.decorator(structured=True)
+    def lazy_func():
+        return LazyResult()
+
+    with caplog.at_level(logging.INFO):
+        lazy_func()
+
+    returned = caplog.records[-1].msg
+    assert returned['message'] == 'method returned'
+    assert returned['result_type'] == 'LazyResult'
+    assert 'result_len' not in returned
+
+
+@pytest.mark.asyncio
+async def test_structured_decorator_logs_failure(logger1, caplog):
+    @logger1.decorator(structured=True)
+    async def failing_func():
+        raise KeyError('missing')
+
+    with caplog.at_level(logging.INFO):
+        with pytest.raises(KeyError):
+            await failing_func()
+
+    called, failed = (record.msg for record in caplog.records)
+    assert called['args'] == {}
+    assert failed['message'] == 'method failed'
+    assert failed['outcome'] == 'error'
+    assert failed['error_type'] == 'KeyError'
+    assert failed['error'] == "'missing'"
+    assert 'result_len' not in failed
+
+
+def test_decorator_mode_from_environment(logger1, caplog, monkeypatch):
+    monkeypatch.setenv('LOG_DECORATOR_MODE', 'structured')
+
+    @logger1.decorator
+    def structured_func():
+        return 42
+
+    with caplog.at_level(logging.INFO):
+        structured_func()
+
+    returned = caplog.records[-1].msg
+    assert returned['message'] == 'method returned'
+    assert 'result_len' not in returned
@@ -0,0 +1,135 @@
+import io
+import logging
+import threading
+from unittest.mock import patch
+
+import pytest
+import risclog.logging
+from risclog.logging import metrics
+from risclog.logging.handlers import RiscStreamHandler
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_emitted_and_dropped_records_are_counted(logger1, caplog):
+    with caplog.at_level(logging.INFO):
+        logger1.info('counted')
+        logger1.info('counted')
+        logger1.fatal('counted')
+        logger1.debug('dropped')
+
+    data = metrics.snapshot()
+    assert data['records_emitted']['test_logger_1'] == {
+        'info': 2,
+        'critical': 1,
+    }
+    assert data['records_dropped']['test_logger_1'] == {'debug': 1}
+    assert 'dropped' not in caplog.text
+    assert data['timings']['processors']['count'] == 3
+
+
+def test_counters_of_all_threads_are_merged(logger1, caplog):
+    def work():
+        for _ in range(25):
+            logger1.info('from thread')
+
+    with caplog.at_level(logging.INFO):
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert metrics.snapshot()['records_emitted']['test_logger_1'] == {
+        'info': 100
+    }
+
+
+def test_handler_records_render_and_write_time():
+    handler = RiscStreamHandler(io.StringIO())
+    record = logging.LogRecord('test', logging.INFO, '', 0, 'msg', (), None)
+
+    handler.emit(record)
+
+    timings = metrics.snapshot()['timings']
+    assert timings['render']['count'] == 1
+    assert timings['handler_write']['count'] == 1
+    assert handler.stream.getvalue() == 'msg\n'
+
+
+@patch('smtplib.SMTP')
+def test_email_counters(mock_smtp, monkeypatch):
+    monkeypatch.setenv('LOGGING_EMAIL_SMTP_USER', 'user')
+    monkeypatch.setenv('LOGGING_EMAIL_SMTP_PASSWORD', 'password')
+    monkeypatch.setenv('LOGGING_EMAIL_TO', 'admin@example.com')
+    monkeypatch.setenv('LOGGING_EMAIL_SMTP_SERVER', 'smtp.example.com')
+
+    risclog.logging.smtp_email_send(message='error', logger_name='test')
+    mock_smtp.side_effect = OSError('connection refused')
+    with pytest.raises(OSError):
+        risclog.logging.smtp_email_send(message='error', logger_name='test')
+
+    assert metrics.snapshot()['emails'] == {
+        'queued': 0,
+        'sent': 1,
+        'failed': 1,
+    }
+
+
+def test_decorator_counts_queued_emails(logger1):
+    @logger1.decorator(send_email=True)
+    def faulty():
+        raise ValueError('error')
+
+    with patch('risclog.logging.smtp_email_send'):
+        with pytest.raises(ValueError):
+            faulty()
+
+    assert metrics.snapshot()['emails']['queued'] == 1
+
+
+def test_render_prometheus():
+    metrics.increment('records_emitted', 'info', 'my"logger')
+    metrics.increment('emails', 'sent')
+    metrics.observe('processors', 0.5)
+
+    text = metrics.render_prometheus()
+
+    assert (
+        'risclog_logging_records_emitted_total{logger="my\\"logger",'
+        'level="info"} 1' in text
+    )
+    assert 'risclog_logging_emails_total{state="sent"} 1' in text
+    assert (
+        'risclog_logging_duration_seconds_sum{stage="processors"} 0.5' in text
+    )
+    assert 'risclog_logging_duration_seconds_count{stage="processors"} 1' in (
+        text
+    )
+
+
+def test_reporter_logs_summary_and_writes_file(tmp_path, caplog):
+    path = tmp_path / 'metrics.prom'
+    metrics.increment('records_emitted', 'info', 'test')
+    reporter = metrics.MetricsReporter(interval=60, path=str(path))
+
+    with caplog.at_level(logging.INFO):
+        reporter.report()
+
+    assert 'logging metrics: emitted=1 dropped=0' in caplog.text
+    assert 'risclog_logging_records_emitted_total' in path.read_text()
+
+
+def test_start_reporter_is_a_singleton():
+    reporter = metrics.start_reporter(interval=60, logger_name=None)
+    try:
+        assert metrics.start_reporter(interval=60) is reporter
+    finally:
+        metrics.stop_reporter()
+    reporter.join(timeout=1)
+    assert not reporter.is_alive()
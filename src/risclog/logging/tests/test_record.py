@@ -0,0 +1,110 @@
+import logging
+
+import structlog
+from risclog.logging import RiscLogger
+from risclog.logging.formatting import RiscFormatter
+from risclog.logging.record import EventRecord
+
+
+def make_record(**kwargs):
+    fields = dict(
+        timestamp=0.0,
+        level='info',
+        logger='test_logger',
+        message='hello %s',
+        id=42,
+        sender='inline',
+    )
+    fields.update(kwargs)
+    return EventRecord(**fields)
+
+
+def test_event_record_has_no_instance_dict():
+    assert not hasattr(make_record(), '__dict__')
+
+
+def test_event_record_reads_like_the_event_dict():
+    record = make_record(
+        function='func',
+        script='script.py',
+        args=('world',),
+        extra={'user': 'x', 'referer': 'https://example.com'},
+    )
+
+    assert list(record) == [
+        '__id',
+        '__sender',
+        '_function',
+        '_script',
+        'level',
+        'logger',
+        'message',
+        'positional_args',
+        'timestamp',
+        'user',
+        'referer',
+    ]
+    assert record['message'] == 'hello %s'
+    assert record['positional_args'] == ('world',)
+    assert record['timestamp'] == '1970-01-01 00:00:00'
+    assert record['user'] == 'x'
+    assert 'missing' not in record
+    assert len(record) == 11
+
+
+def test_event_record_skips_unset_fields():
+    assert list(make_record(logger=None)) == [
+        '__id',
+        '__sender',
+        'level',
+        'message',
+        'timestamp',
+    ]
+
+
+def test_formatter_renders_event_record_like_processor_chain():
+    formatter = RiscLogger._create_formatter(
+        structlog.dev.ConsoleRenderer(colors=False)
+    )
+    assert isinstance(formatter, RiscFormatter)
+    record = logging.LogRecord(
+        'test_logger',
+        logging.INFO,
+        '',
+        0,
+        make_record(args=('world',), extra={'user': 'x'}),
+        (),
+        None,
+    )
+
+    assert formatter.format(record) == (
+        '1970-01-01 00:00:00 [info     ] [test_logger] __id=42 '
+        '__sender=inline message=hello world user=x'
+    )
+
+
+def test_logger_passes_event_record_to_handlers(logger1, caplog):
+    with caplog.at_level(logging.INFO):
+        logger1.info('value %d', 3, user='x')
+
+    (record,) = caplog.records
+    assert isinstance(record.msg, EventRecord)
+    assert record.msg.level == 'info'
+    assert record.msg.args == (3,)
+    assert record.msg.extra == {'user': 'x'}
+    assert record.created == record.msg.timestamp
+
+
+def test_stack_info_is_rendered(logger1, caplog):
+    formatter = RiscLogger._create_formatter(
+        structlog.dev.ConsoleRenderer(colors=False)
+    )
+    with caplog.at_level(logging.INFO):
+        logger1.info('with stack', stack_info=True)
+
+    (record,) = caplog.records
+    assert 'stack_info' not in record.msg.extra
+    lines = formatter.format(record).splitlines()
+    assert 'stack_info' not in lines[0]
+    assert lines[1] == 'Stack (most recent call last):'
+    assert "logger1.info('with stack', stack_info=True)" in lines[-1]
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import threading
+from unittest.mock import patch
+
+import pytest
+from risclog.logging import recorder
+
+
+@pytest.fixture
+def flight_recorder():
+    recorder.enable(capacity=3)
+    yield recorder
+    recorder.drain()
+    recorder.disable()
+
+
+def test_records_below_level_are_not_captured_when_disabled(logger1, handler):
+    logger1.debug('not captured')
+
+    assert recorder.drain() == []
+    assert handler.records == []
+
+
+def test_buffer_keeps_the_last_records(flight_recorder, logger1, handler):
+    for i in range(5):
+        logger1.debug(f'debug {i}')
+
+    records = recorder.drain()
+
+    assert [r.msg for r in records] == ['debug 2', 'debug 3', 'debug 4']
+    assert records[0].levelno == logging.DEBUG
+    assert records[0].fields['__sender'] == 'inline'
+    assert handler.records == []
+    assert recorder.drain() == []
+
+
+def test_exception_flushes_buffer(flight_recorder, logger1, handler):
+    logger1.debug('context line')
+    logger1.exception('failure')
+
+    assert len(handler.records) == 2
+    assert handler.records[0].getMessage() == 'context line'
+    assert handler.records[0].levelno == logging.DEBUG
+    assert handler.records[0].flight_recorder is True
+    assert handler.records[1].msg['message'] == 'failure'
+
+
+def test_buffers_are_per_thread(flight_recorder, logger1, handler):
+    logger1.debug('main thread')
+    captured = []
+
+    def work():
+        logger1.debug('other thread')
+        captured.extend(recorder.drain())
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+
+    assert [r.msg for r in captured] == ['other thread']
+    assert [r.msg for r in recorder.drain()] == ['main thread']
+
+
+@pytest.mark.asyncio
+async def test_buffers_are_per_task(flight_recorder, logger1, handler):
+    await logger1.debug('parent task')
+
+    async def child():
+        await logger1.debug('child task')
+        return recorder.drain()
+
+    captured = await asyncio.create_task(child())
+
+    assert [r.msg for r in captured] == ['child task']
+    assert [r.msg for r in recorder.drain()] == ['parent task']
+
+
+@patch('risclog.logging.smtp_email_send')
+def test_decorator_attaches_debug_context_to_email(
+    mock_smtp_send, flight_recorder, logger1, handler
+):
+    @logger1.decorator(send_email=True)
+    def faulty():
+        logger1.debug('about to fail')
+        raise ValueError('broken')
+
+    with pytest.raises(ValueError):
+        faulty()
+
+    message = mock_smtp_send.call_args.kwargs['message']
+    assert 'Debug context:' in message
+    assert 'message=about to fail' in message
+    assert '_function=faulty' in message
+    assert any(
+        getattr(r, 'flight_recorder', False)
+        and r.getMessage() == 'about to fail'
+        for r in handler.records
+    )
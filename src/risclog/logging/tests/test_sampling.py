@@ -0,0 +1,127 @@
+import logging
+
+import httpx
+import pytest
+from risclog.logging import metrics
+from risclog.logging.sampling import (
+    SamplingASGIMiddleware,
+    SamplingWSGIMiddleware,
+    TailSampler,
+)
+
+
+def never():
+    return 1.0
+
+
+def always():
+    return 0.0
+
+
+def test_records_of_sampled_out_requests_are_dropped(logger1, handler):
+    metrics.reset()
+    sampler = TailSampler(sample_rate=0.5, random=never)
+
+    with sampler.request():
+        logger1.info('dropped')
+
+    assert handler.records == []
+    dropped = metrics.snapshot()['records_dropped']
+    assert dropped['test_logger_1']['info'] == 1
+
+
+def test_records_are_held_until_request_end(logger1, handler):
+    sampler = TailSampler(sample_rate=0.5, random=always)
+
+    with sampler.request():
+        logger1.info('first')
+        logger1.info('second')
+        assert handler.records == []
+    logger1.info('outside')
+
+    assert handler.messages == ['first', 'second', 'outside']
+
+
+def test_error_record_keeps_request(logger1, handler):
+    sampler = TailSampler(sample_rate=0, random=never)
+
+    with sampler.request():
+        logger1.info('context')
+        logger1.error('failure')
+
+    assert handler.messages == ['context', 'failure']
+
+
+def test_exception_keeps_request(logger1, handler):
+    sampler = TailSampler(sample_rate=0, random=never)
+
+    with pytest.raises(ValueError):
+        with sampler.request():
+            logger1.info('context')
+            raise ValueError('failure')
+
+    assert handler.messages == ['context']
+
+
+def test_slow_request_is_kept(logger1, handler):
+    sampler = TailSampler(sample_rate=0, slow_threshold=0, random=never)
+
+    with sampler.request():
+        logger1.info('slow')
+
+    assert handler.messages == ['slow']
+
+
+def test_requests_above_max_records_pass_through(logger1, handler):
+    sampler = TailSampler(sample_rate=0, max_records=2, random=never)
+
+    with sampler.request():
+        logger1.info('first')
+        assert handler.records == []
+        logger1.info('second')
+        assert handler.messages == ['first', 'second']
+        logger1.info('third')
+        assert handler.messages == ['first', 'second', 'third']
+
+
+@pytest.mark.asyncio
+async def test_asgi_middleware_keeps_failed_requests(logger1, handler):
+    async def app(scope, receive, send):
+        await logger1.info(f'handling {scope["path"]}')
+        status = 500 if scope['path'] == '/fail' else 200
+        await send(
+            {'type': 'http.response.start', 'status': status, 'headers': []}
+        )
+        await send({'type': 'http.response.body', 'body': b'done'})
+
+    sampled = SamplingASGIMiddleware(
+        app, TailSampler(sample_rate=0, random=never)
+    )
+    transport = httpx.ASGITransport(app=sampled)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://test'
+    ) as client:
+        assert (await client.get('/ok')).status_code == 200
+        assert (await client.get('/fail')).status_code == 500
+
+    assert handler.messages == ['handling /fail']
+
+
+def test_wsgi_middleware_keeps_failed_requests(logger1, handler):
+    def app(environ, start_response):
+        path = environ['PATH_INFO']
+        logger1.info(f'handling {path}')
+        status = '500 Internal Server Error' if path == '/fail' else '200 OK'
+        start_response(status, [('Content-Type', 'text/plain')])
+        return [b'done']
+
+    sampled = SamplingWSGIMiddleware(
+        app, TailSampler(sample_rate=0, random=never)
+    )
+    with httpx.Client(
+        transport=httpx.WSGITransport(app=sampled), base_url='http://test'
+    ) as client:
+        assert client.get('/ok').status_code == 200
+        assert client.get('/fail').status_code == 500
+
+    assert handler.messages == ['handling /fail']
@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from risclog.logging import RiscLogger, metrics
+from risclog.logging.shipping import ShippingHandler, parse_address
+
+
+class Collector:
+    """Local stand-in for a log collector."""
+
+    def __init__(self, address=('127.0.0.1', 0), family=socket.AF_INET):
+        collector = self
+        self.received = b''
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with collector._lock:
+                    collector.connections += 1
+                while True:
+                    data = self.request.recv(65536)
+                    if not data:
+                        return
+                    with collector._lock:
+                        collector.received += data
+
+        if family == socket.AF_UNIX:
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+        server_class.allow_reuse_address = True
+        server_class.daemon_threads = True
+        self.server = server_class(address, Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def url(self):
+        if isinstance(self.server.server_address, str):
+            return f'unix://{self.server.server_address}'
+        host, port = self.server.server_address
+        return f'tcp://{host}:{port}'
+
+    def wait_for(self, count, sep=b'\n', timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self.received.count(sep) >= count:
+                    return self.received
+            time.sleep(0.01)
+        return self.received
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def collector():
+    collector = Collector()
+    yield collector
+    collector.stop()
+
+
+def make_record(msg, level=logging.INFO):
+    return logging.LogRecord('shipping', level, '', 0, msg, (), None)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_parse_address():
+    assert parse_address('tcp://localhost:514') == (
+        socket.AF_INET,
+        ('localhost', 514),
+    )
+    assert parse_address('unix:///run/collector.sock') == (
+        socket.AF_UNIX,
+        '/run/collector.sock',
+    )
+    with pytest.raises(ValueError):
+        parse_address('udp://localhost:514')
+
+
+def test_records_are_sent_over_one_connection(collector):
+    handler = ShippingHandler(collector.url, batch_size=2, interval=0.01)
+    for i in range(10):
+        handler.handle(make_record(f'line {i}'))
+    handler.flush()
+
+    received = collector.wait_for(10)
+    handler.close()
+
+    assert received.decode().splitlines() == [f'line {i}' for i in range(10)]
+    assert collector.connections == 1
+
+
+def test_unix_socket(tmp_path):
+    collector = Collector(str(tmp_path / 'collector.sock'), socket.AF_UNIX)
+    try:
+        handler = ShippingHandler(collector.url, interval=0.01)
+        handler.handle(make_record('over unix socket'))
+        received = collector.wait_for(1)
+        handler.close()
+    finally:
+        collector.stop()
+
+    assert received == b'over unix socket\n'
+
+
+def test_syslog_format(collector):
+    handler = ShippingHandler(collector.url, protocol='syslog', interval=0.01)
+    handler.handle(make_record('warning', level=logging.WARNING))
+
+    received = collector.wait_for(1, sep=b'warning')
+    handler.close()
+
+    length, message = received.split(b' ', 1)
+    assert int(length) == len(message)
+    assert message.startswith(b'<12>1 ')
+    assert message.endswith(b' risclog %d shipping - warning' % os.getpid())
+
+
+def test_records_are_buffered_and_sent_after_reconnect():
+    port = free_port()
+    handler = ShippingHandler(
+        f'tcp://127.0.0.1:{port}', interval=0.01, max_backoff=0.05
+    )
+    for i in range(3):
+        handler.handle(make_record(f'during outage {i}'))
+    time.sleep(0.1)
+
+    collector = Collector(('127.0.0.1', port))
+    try:
+        received = collector.wait_for(3)
+        handler.close()
+    finally:
+        collector.stop()
+
+    assert received.decode().splitlines() == [
+        f'during outage {i}' for i in range(3)
+    ]
+
+
+def test_records_beyond_memory_bound_are_spilled_to_disk(tmp_path):
+    port = free_port()
+    spill_path = str(tmp_path / 'spill.log')
+    handler = ShippingHandler(
+        f'tcp://127.0.0.1:{port}',
+        interval=0.01,
+        max_backoff=0.05,
+        max_buffer_bytes=20,
+        spill_path=spill_path,
+    )
+    for i in range(5):
+        handler.handle(make_record(f'record {i}'))
+
+    with open(spill_path, 'rb') as f:
+        assert f.read() == b'record 2\nrecord 3\nrecord 4\n'
+
+    collector = Collector(('127.0.0.1', port))
+    try:
+        received = collector.wait_for(5)
+        handler.close()
+    finally:
+        collector.stop()
+
+    assert received.decode().splitlines() == [f'record {i}' for i in range(5)]
+    assert not os.path.exists(spill_path)
+
+
+def test_undeliverable_records_are_spilled_on_close(tmp_path):
+    spill_path = tmp_path / 'spill.log'
+    handler = ShippingHandler(
+        f'tcp://127.0.0.1:{free_port()}',
+        interval=0.01,
+        spill_path=str(spill_path),
+    )
+    handler.handle(make_record('undelivered'))
+    handler.close()
+
+    assert spill_path.read_bytes() == b'undelivered\n'
+
+
+def test_shutdown_does_not_wait_for_unreachable_collector():
+    metrics.reset()
+    handler = ShippingHandler(f'tcp://127.0.0.1:{free_port()}', interval=0.01)
+    handler.handle(make_record('undelivered'))
+    handler.handle(make_record('undelivered', level=logging.ERROR))
+
+    start = time.monotonic()
+    handler.flush()
+    handler.close()
+
+    assert time.monotonic() - start < 1
+    assert metrics.snapshot()['records_dropped']['shipping'] == {
+        'info': 1,
+        'error': 1,
+    }
+    metrics.reset()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_child_ships_over_its_own_connection(collector):
+    script = f'''
+import logging, os, time
+from risclog.logging.shipping import ShippingHandler
+
+handler = ShippingHandler({collector.url!r}, interval=0.01)
+handler.handle(logging.makeLogRecord({{'msg': 'parent'}}))
+time.sleep(0.2)
+pid = os.fork()
+if pid == 0:
+    handler.handle(logging.makeLogRecord({{'msg': 'child'}}))
+    handler.flush()
+    handler.close()
+    os._exit(0)
+os.waitpid(pid, 0)
+handler.handle(logging.makeLogRecord({{'msg': 'parent again'}}))
+handler.flush()
+handler.close()
+'''
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=30)
+
+    received = collector.wait_for(3)
+
+    assert sorted(received.decode().splitlines()) == [
+        'child',
+        'parent',
+        'parent again',
+    ]
+    assert collector.connections == 2
+
+
+def test_json_lines_from_configured_handler(collector, logger1):
+    handler = RiscLogger._create_shipping_handler(collector.url)
+    logger = logging.getLogger(logger1.logger_name)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        logger1.info('shipped %s', 'as json', user='test')
+        received = collector.wait_for(1)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+        handler.close()
+
+    data = json.loads(received)
+    assert data['message'] == 'shipped as json'
+    assert data['user'] == 'test'
+    assert data['logger'] == 'test_logger_1'
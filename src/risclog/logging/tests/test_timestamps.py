@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from risclog.logging.timestamps import CachedTimeStamper
+
+
+def test_formats_like_strftime_in_utc():
+    timestamper = CachedTimeStamper()
+
+    assert timestamper.format(86400.75) == '1970-01-02 00:00:00'
+
+
+def test_local_time():
+    timestamper = CachedTimeStamper(utc=False)
+    now = time.time()
+
+    assert timestamper.format(now) == time.strftime(
+        '%Y-%m-%d %H:%M:%S', time.localtime(now)
+    )
+
+
+@pytest.mark.parametrize(
+    'precision, expected',
+    [(3, '1970-01-01 00:00:01.250'), (6, '1970-01-01 00:00:01.250000')],
+)
+def test_sub_second_precision(precision, expected):
+    timestamper = CachedTimeStamper(precision=precision)
+
+    assert timestamper.format(1.25) == expected
+
+
+@pytest.mark.parametrize(
+    'timestamp, expected',
+    [
+        (1700000000.123, '2023-11-14 22:13:20.123'),
+        (1700000000.999, '2023-11-14 22:13:20.999'),
+        (2.3, '1970-01-01 00:00:02.300'),
+    ],
+)
+def test_sub_second_digits_are_exact(timestamp, expected):
+    assert CachedTimeStamper(precision=3).format(timestamp) == expected
+
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        CachedTimeStamper(precision=9)
+
+
+def test_reuses_prefix_within_the_same_second(monkeypatch):
+    timestamper = CachedTimeStamper(fmt='%S')
+    calls = []
+    strftime = time.strftime
+
+    def counting_strftime(*args):
+        calls.append(args)
+        return strftime(*args)
+
+    monkeypatch.setattr(time, 'strftime', counting_strftime)
+    assert timestamper.format(10.1) == '10'
+    assert timestamper.format(10.9) == '10'
+    assert timestamper.format(11.0) == '11'
+    assert len(calls) == 2
+
+
+def test_processor_sets_key():
+    event_dict = CachedTimeStamper(key='ts')(None, 'info', {})
+
+    assert set(event_dict) == {'ts'}
+
+
+def test_threads_get_the_timestamp_of_their_record():
+    timestamper = CachedTimeStamper(fmt='%S')
+    errors = []
+
+    def work(offset):
+        for second in range(offset, offset + 500):
+            if timestamper.format(second + 0.5) != f'{second % 60:02d}':
+                errors.append(second)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
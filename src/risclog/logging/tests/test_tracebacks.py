@@ -0,0 +1,152 @@
+import linecache
+import logging
+import traceback
+from unittest.mock import patch
+
+import pytest
+import risclog.logging
+from risclog.logging import tracebacks
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    tracebacks.clear_cache()
+    yield
+    tracebacks.clear_cache()
+
+
+def recurse(depth):
+    if depth:
+        recurse(depth - 1)
+    raise RuntimeError('recursion')
+
+
+def catch(func, *args):
+    try:
+        func(*args)
+    except Exception as exc:
+        return exc
+
+
+def test_matches_traceback_module_output():
+    exc = catch(recurse, 2)
+    expected = traceback.format_list(
+        traceback.extract_stack()[:-1]
+        + traceback.extract_tb(exc.__traceback__)
+    )
+
+    result = tracebacks.format_exception(exc)
+
+    for frame in expected[-4:]:
+        assert frame.splitlines()[0] in result
+    assert result.endswith("\n  <class 'RuntimeError'> recursion")
+    assert 'in test_matches_traceback_module_output' in result
+
+
+def test_formatted_frames_are_cached():
+    results = []
+    calls = []
+    with patch.object(
+        linecache, 'getline', wraps=linecache.getline
+    ) as getline:
+        for _ in range(2):
+            results.append(tracebacks.format_exception(catch(recurse, 1)))
+            calls.append(getline.call_count)
+
+    assert calls[0] > 0
+    assert calls[1] == calls[0]
+    assert results[0] == results[1]
+
+
+def test_recursion_is_collapsed():
+    result = tracebacks.format_exception(catch(recurse, 20))
+
+    assert result.count('in recurse') == 4
+    assert '[Previous line repeated 17 more times]' in result
+
+
+def test_depth_is_limited():
+    result = tracebacks.format_exception(catch(recurse, 20), limit=3)
+
+    assert result.startswith('  [')
+    assert 'outer frames omitted]' in result
+    assert result.count('  File ') == 3
+
+
+def test_length_is_limited():
+    result = tracebacks.format_exception(catch(recurse, 20), max_length=300)
+
+    assert len(result) < 600
+    assert 'outer frames omitted]' in result
+    assert result.endswith("<class 'RuntimeError'> recursion")
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(tracebacks, 'MAX_CACHED_FRAMES', 2)
+    tracebacks.format_exception(catch(recurse, 3))
+
+    assert len(tracebacks._frame_cache()) <= 2
+
+
+def test_exception_to_string_uses_renderer():
+    exc = catch(recurse, 0)
+
+    with patch.object(
+        tracebacks, 'format_exception', return_value='rendered'
+    ) as format_exception:
+        assert risclog.logging.exception_to_string(exc, limit=5) == 'rendered'
+
+    format_exception.assert_called_once_with(exc, limit=5)
+
+
+@pytest.mark.parametrize('send_email', [False, True])
+def test_decorator_logs_traceback_with_and_without_email(
+    logger1, caplog, send_email
+):
+    @logger1.decorator(send_email=send_email)
+    def faulty():
+        recurse(0)
+
+    with patch.object(
+        tracebacks, 'format_exception', return_value='rendered'
+    ) as format_exception, patch(
+        'risclog.logging.smtp_email_send'
+    ) as smtp_email_send:
+        with pytest.raises(RuntimeError):
+            faulty()
+
+    format_exception.assert_called_once()
+    message = caplog.records[-1].msg['message']
+    assert message.endswith('exception: recursion\n\n\nrendered')
+    if send_email:
+        assert smtp_email_send.call_args.kwargs['message'] == message
+
+
+def test_structured_decorator_logs_traceback_field(logger1, caplog):
+    @logger1.decorator(structured=True)
+    def faulty():
+        recurse(0)
+
+    with pytest.raises(RuntimeError):
+        faulty()
+
+    traceback = caplog.records[-1].msg['traceback']
+    assert 'in faulty' in traceback
+    assert traceback.endswith("<class 'RuntimeError'> recursion")
+
+
+def test_decorator_does_not_render_unlogged_traceback(logger1):
+    @logger1.decorator
+    def faulty():
+        recurse(0)
+
+    logger = logging.getLogger(faulty.__module__)
+    logger.setLevel(logging.CRITICAL)
+    try:
+        with patch.object(tracebacks, 'format_exception') as format_exception:
+            with pytest.raises(RuntimeError):
+                faulty()
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+    format_exception.assert_not_called()
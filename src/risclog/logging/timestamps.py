@@ -0,0 +1,58 @@
+"""Timestamp formatting that calls `strftime` at most once per second.
+
+`CachedTimeStamper` keeps the formatted second of the last record and reuses
+it for all records within the same second. The cache is a single tuple that
+is replaced as a whole, so threads never see a prefix of another second and
+the common path needs no lock. Two threads formatting a new second at the
+same time both call `strftime` once, which is harmless.
+"""
+import time
+from typing import Optional, Tuple
+
+from structlog.types import EventDict, WrappedLogger
+
+
+class CachedTimeStamper:
+    """Processor adding a formatted timestamp under `key`.
+
+    A drop-in replacement for ``structlog.processors.TimeStamper(fmt=fmt)``
+    for `strftime` formats. `precision` appends that many sub-second digits
+    (e.g. 3 for milliseconds) to the formatted second.
+    """
+
+    __slots__ = ('fmt', 'utc', 'key', 'precision', '_convert', '_cache')
+
+    def __init__(
+        self,
+        fmt: str = '%Y-%m-%d %H:%M:%S',
+        utc: bool = True,
+        key: str = 'timestamp',
+        precision: int = 0,
+    ) -> None:
+        if not 0 <= precision <= 6:
+            raise ValueError('precision must be between 0 and 6')
+        self.fmt = fmt
+        self.utc = utc
+        self.key = key
+        self.precision = precision
+        self._convert = time.gmtime if utc else time.localtime
+        self._cache: Tuple[Optional[int], str] = (None, '')
+
+    def format(self, timestamp: float) -> str:
+        # Whole microseconds, as the float difference to the second would
+        # turn e.g. .123 into .122999...
+        second, microsecond = divmod(round(timestamp * 1_000_000), 1_000_000)
+        cached_second, prefix = self._cache
+        if cached_second != second:
+            prefix = time.strftime(self.fmt, self._convert(second))
+            self._cache = (second, prefix)
+        if not self.precision:
+            return prefix
+        fraction = microsecond // 10 ** (6 - self.precision)
+        return f'{prefix}.{fraction:0{self.precision}d}'
+
+    def __call__(
+        self, logger: WrappedLogger, name: str, event_dict: EventDict
+    ) -> EventDict:
+        event_dict[self.key] = self.format(time.time())
+        return event_dict
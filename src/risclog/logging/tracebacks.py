@@ -0,0 +1,121 @@
+"""Bounded traceback rendering with a per-line cache.
+
+Formatted frames are cached per (code object, line number), so an error that
+is raised over and over (e.g. in a retry loop) does not walk the stack through
+`traceback.extract_stack` or read source lines through `linecache` again.
+Each thread has its own cache, so no dict is shared between threads.
+"""
+import linecache
+import threading
+from types import CodeType, FrameType, TracebackType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAX_CACHED_FRAMES = 4096
+DEFAULT_LIMIT = 64
+DEFAULT_MAX_LENGTH = 32 * 1024
+RECURSION_CUTOFF = 3
+
+_local = threading.local()
+
+
+def _frame_cache() -> Dict[Tuple[CodeType, int], str]:
+    try:
+        return _local.frames
+    except AttributeError:
+        _local.frames = {}
+        return _local.frames
+
+
+def format_frame(code: CodeType, lineno: int) -> str:
+    key = (code, lineno)
+    cache = _frame_cache()
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    text = f'  File "{code.co_filename}", line {lineno}, in {code.co_name}\n'
+    line = linecache.getline(code.co_filename, lineno).strip()
+    if line:
+        text += f'    {line}\n'
+    if len(cache) >= MAX_CACHED_FRAMES:
+        cache.clear()
+    cache[key] = text
+    return text
+
+
+def clear_cache() -> None:
+    """Clear the cache of the calling thread."""
+    _frame_cache().clear()
+
+
+def _outer_frames(frame: Optional[FrameType]) -> List[Tuple[CodeType, int]]:
+    frames = []
+    while frame is not None:
+        frames.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _traceback_frames(
+    tb: Optional[TracebackType],
+) -> Iterator[Tuple[CodeType, int]]:
+    while tb is not None:
+        yield tb.tb_frame.f_code, tb.tb_lineno
+        tb = tb.tb_next
+
+
+def _collapse_recursion(frames: List[Tuple[CodeType, int]]) -> List[str]:
+    lines = []
+    previous = None
+    repeated = 0
+    for frame in frames:
+        if frame == previous:
+            repeated += 1
+            if repeated >= RECURSION_CUTOFF:
+                continue
+        else:
+            if repeated >= RECURSION_CUTOFF:
+                lines.append(
+                    f'  [Previous line repeated '
+                    f'{repeated - RECURSION_CUTOFF + 1} more times]\n'
+                )
+            previous = frame
+            repeated = 0
+        lines.append(format_frame(*frame))
+    if repeated >= RECURSION_CUTOFF:
+        lines.append(
+            f'  [Previous line repeated '
+            f'{repeated - RECURSION_CUTOFF + 1} more times]\n'
+        )
+    return lines
+
+
+def format_exception(
+    exc: BaseException,
+    limit: int = DEFAULT_LIMIT,
+    max_length: int = DEFAULT_MAX_LENGTH,
+) -> str:
+    """Render `exc` including the stack of the frame that caught it.
+
+    At most the innermost `limit` frames are rendered, consecutive identical
+    frames are collapsed and the result is cut to about `max_length`
+    characters, dropping outer frames first.
+    """
+    tb = exc.__traceback__
+    frames = _outer_frames(tb.tb_frame.f_back if tb is not None else None)
+    frames.extend(_traceback_frames(tb))
+
+    omitted = max(len(frames) - limit, 0)
+    lines = _collapse_recursion(frames[omitted:])
+    summary = f'\n  {exc.__class__} {exc}'
+
+    length = len(summary) + sum(len(line) for line in lines)
+    while len(lines) > 1 and length > max_length:
+        line = lines.pop(0)
+        length -= len(line)
+        if not line.startswith('  [Previous line'):
+            omitted += 1
+    if omitted:
+        lines.insert(0, f'  [{omitted} outer frames omitted]\n')
+    return ''.join(lines) + summary